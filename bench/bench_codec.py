@@ -0,0 +1,78 @@
+#! /usr/bin/env python3
+"""
+Compare decode time of a large `item.get` reply across JSON libraries.
+
+Usage: PYTHONPATH=.:.pip python3 bench/bench_codec.py [<reply.json>] [<items>]
+
+Arguments:
+  - reply.json: a captured `item.get` reply.  A synthetic reply of
+    `items` items (default 50000) is generated when not given.
+"""
+import sys
+import json
+import time
+import random
+import importlib
+
+
+def synthetic_reply(n):
+    """
+    Bytes of an `item.get` reply with `n` items shaped like a real one.
+    """
+    from xibbaz.objects import Item
+    result = []
+    for i in range(n):
+        item = dict((name, '0') for name in Item.PROPS)
+        item.update(
+            itemid = str(100000 + i),
+            hostid = str(10000 + i // 100),
+            key_ = 'net.if.in[eth{}]'.format(i % 8),
+            name = 'Incoming network traffic on eth{}'.format(i % 8),
+            lastvalue = str(random.random() * 1e6),
+            lastclock = str(1530000000 + i),
+            description = 'Some description of item {}'.format(i),
+        )
+        result.append(item)
+    return json.dumps(dict(jsonrpc='2.0', result=result, id=1)).encode('utf-8')
+
+
+def timeit(fn, data, repeat=5):
+    """
+    Best wall time of `repeat` calls of `fn(data)`.
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(data)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(argv):
+    if argv and not argv[0].isdigit():
+        data = open(argv.pop(0), 'rb').read()
+    else:
+        data = synthetic_reply(int(argv[0]) if argv else 50000)
+    print('reply size: {:.1f} MB'.format(len(data) / 1e6))
+
+    cases = [
+        ('json.loads(text)', lambda d: json.loads(d.decode('utf-8'))),
+        ('json.loads(bytes)', json.loads),
+    ]
+    for name in ('ujson', 'orjson'):
+        try:
+            mod = importlib.import_module(name)
+        except ImportError:
+            print('{:20} not installed'.format(name))
+            continue
+        cases.append(('{}.loads(bytes)'.format(name), mod.loads))
+
+    from xibbaz import codec
+    cases.append(('xibbaz.codec ({})'.format(codec.NAME), codec.loads))
+    for name, fn in cases:
+        print('{:30} {:8.3f} s'.format(name, timeit(fn, data)))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,63 @@
+#! /usr/bin/env python3
+"""
+Time building `Item` & `Host` objects in bulk from reply dicts.
+
+Usage: PYTHONPATH=.:.pip python3 bench/bench_objects.py [<count>]
+
+Arguments:
+  - count: number of objects of each kind to build (default 50000)
+"""
+import sys
+import time
+
+
+def attrs(Class, n):
+    """
+    `n` reply dicts for `Class` with every property set.
+    """
+    from datetime import datetime
+    l = []
+    for i in range(n):
+        d = dict()
+        for name, spec in Class.PROPS.items():
+            kind = spec.get('kind', str)
+            if spec.get('vals'):
+                d[name] = str(sorted(spec['vals'])[0])
+            elif kind in (int, datetime):
+                d[name] = str(1530000000 + i)
+            else:
+                d[name] = 'value {}'.format(i)
+        d[Class._id_field()] = str(i)
+        l.append(d)
+    return l
+
+
+def timeit(fn, repeat=3):
+    """
+    Best wall time of `repeat` calls of `fn()`.
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(argv):
+    from xibbaz import Api
+    from xibbaz.objects import Host, Item
+    n = int(argv[0]) if argv else 50000
+    api = Api('http://localhost', session=object(), identity_map=False)
+    for Class, fields in ((Item, ('key_', 'value_type', 'lastvalue')), (Host, ('host', 'status', 'available'))):
+        replies = attrs(Class, n)
+        build = lambda: [Class._from_api(api, i) for i in replies]
+        read = lambda: [[getattr(o, f).val for f in fields] for o in (Class._from_api(api, i) for i in replies)]
+        dump = lambda: [o.json() for o in (Class._from_api(api, i) for i in replies)]
+        print('{:5} build {:8.3f} s  build+read 3 {:8.3f} s  build+json {:8.3f} s'.format(
+            Class.__name__, timeit(build), timeit(read), timeit(dump)))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
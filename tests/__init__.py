@@ -7,7 +7,7 @@ from functools import partial
 from datetime import datetime
 import json
 from xibbaz import Api, ApiException
-from xibbaz.objects import Host, HostGroup
+from xibbaz.objects import Host, Group
 
 
 @contextmanager
@@ -23,6 +23,7 @@ def api_session(auth=True):
     with patch('xibbaz.api.requests.session') as session:
         api = Api('http://xibbaz', session)
         api.mock_reply = partial(mock_reply, session)
+        api.mock_replies = partial(mock_replies, session)
         if auth:
             api.mock_reply(result='36fc69043640c433c0010773499b44af')
             api.login('user', 'pass')
@@ -34,7 +35,28 @@ def mock_reply(session, **fields):
     """
     fields['jsonrpc'] = '2.0'
     fields['id'] = 0
-    session.post.return_value = Mock(text=json.dumps(fields))
+    text = json.dumps(fields)
+    session.post.return_value = Mock(text=text, content=text.encode('utf-8'))
+
+def mock_replies(session, *results):
+    """
+    Mock successive session.post() responses, one per result.
+    """
+    replies = [dict(jsonrpc='2.0', id=0, result=i) for i in results]
+    texts = [json.dumps(i) for i in replies]
+    session.post.side_effect = [Mock(text=i, content=i.encode('utf-8')) for i in texts]
+
+def sent_payload(call):
+    """
+    JSON-RPC request sent by a mocked session.post() `call`.
+    """
+    return json.loads(call[1]['data'])
+
+def sent_params(call):
+    """
+    Params of the request sent by a mocked session.post() `call`.
+    """
+    return sent_payload(call)['params']
 
 
 def test_auth1():
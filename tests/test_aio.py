@@ -0,0 +1,91 @@
+import asyncio
+import pytest
+from mock import patch
+from xibbaz import AsyncApi, ApiException
+from xibbaz.objects import Host
+from . import api_session, mock_reply
+
+
+def run(coro):
+    return asyncio.new_event_loop().run_until_complete(coro)
+
+
+def test_hosts1():
+    'AsyncApi calls are awaitable and build ApiObjects.'
+    with patch('xibbaz.api.requests.session') as session:
+        api = AsyncApi('http://xibbaz', session, concurrency=2)
+        mock_reply(session, result=[{"hostid":"45","name":"MyHost"}])
+        async def fanout():
+            return await asyncio.gather(api.hosts(), api.hosts(), api.hosts())
+        hosts = run(fanout())
+        assert ['MyHost'] * 3 == [i[0].name.val for i in hosts]
+        api.close()
+
+
+def test_auth1():
+    'Return true when auth succeeds.'
+    with patch('xibbaz.api.requests.session') as session:
+        api = AsyncApi('http://xibbaz', session)
+        mock_reply(session, result='36fc69043640c433c0010773499b44af')
+        assert run(api.login('user', 'pass'))
+        api.close()
+
+
+def test_relations1():
+    'Async relation variants use the AsyncApi.'
+    with patch('xibbaz.api.requests.session') as session:
+        api = AsyncApi('http://xibbaz', session)
+        mock_reply(session, result=[{"hostid":"45","name":"MyHost"}])
+        host = run(api.host('MyHost'))
+        mock_reply(session, result=[{"groupid":"42","name":"MyGroup"}])
+        groups = run(host.agroups())
+        assert groups[0].id == '42'
+        assert host.groups is groups
+        api.close()
+
+
+def test_by_name1():
+    'Name resolution is awaitable too.'
+    with patch('xibbaz.api.requests.session') as session:
+        api = AsyncApi('http://xibbaz', session)
+        mock_reply(session, result=[{"hostid":"45","name":"MyHost"}])
+        resolved = run(api.hosts_by_name(['MyHost', 'Other']))
+        assert resolved['MyHost'].id == '45'
+        assert resolved.missing == ['Other']
+        mock_reply(session, result=[{"applicationid":"3","name":"MyApp"}])
+        assert run(api.application('MyApp')).id == '3'
+        api.close()
+
+
+def test_history1():
+    'History is fetched on the thread pool.'
+    with patch('xibbaz.api.requests.session') as session:
+        api = AsyncApi('http://xibbaz', session)
+        mock_reply(session, result=[{"itemid":"7","value_type":"3"}])
+        item = run(api.item('7'))
+        mock_reply(session, result=[{"itemid":"7","clock":"100","ns":"0","value":"5"}])
+        hist = run(api.history([item], 0, 200))
+        assert list(hist[7].value) == [5]
+        api.close()
+
+
+def test_sync1():
+    'Objects fetched via an AsyncApi also work synchronously.'
+    with patch('xibbaz.api.requests.session') as session:
+        api = AsyncApi('http://xibbaz', session)
+        mock_reply(session, result=[{"hostid":"45","name":"MyHost"}])
+        host = run(api.host('MyHost'))
+        assert host._api is api.sync
+        mock_reply(session, result=[{"groupid":"42","name":"MyGroup"}])
+        assert host.groups[0].id == '42'
+        mock_reply(session, result=[{"hostid":"45","name":"MyHost"}])
+        assert [i.id for i in api.sync.iter_hosts()] == ['45']
+        api.close()
+
+
+def test_not_async1():
+    'Awaitable variants of objects fetched via an Api raise.'
+    with api_session() as api:
+        host = Host(api, hostid='45')
+        with pytest.raises(ApiException):
+            run(host.agroups())
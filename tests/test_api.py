@@ -0,0 +1,188 @@
+from pytest import raises
+from mock import Mock
+import json
+from concurrent.futures import ThreadPoolExecutor
+from xibbaz import ApiException
+from xibbaz.cache import ResponseCache
+from . import api_session, sent_params, sent_payload
+
+
+def mock_batch_reply(api, replies):
+    """
+    Mock session.post() response to look like a zabbix batch response.
+    """
+    for reply in replies:
+        reply['jsonrpc'] = '2.0'
+    text = json.dumps(replies)
+    api._session.post.return_value = Mock(text=text, content=text.encode('utf-8'))
+
+
+def test_batch1():
+    'Batched replies are matched back to their calls by id.'
+    with api_session() as api:
+        mock_batch_reply(api, [
+            {'id': 2, 'result': ['b']},
+            {'id': 1, 'result': ['a']},
+        ])
+        replies = api.responses([
+            ('host.get', dict(filter=dict(name='a'))),
+            ('host.get', dict(filter=dict(name='b'))),
+        ])
+        assert [['a'], ['b']] == [i['result'] for i in replies]
+        payload = sent_payload(api._session.post.call_args)
+        assert [1, 2] == [i['id'] for i in payload]
+
+
+def test_batch2():
+    'Each call in a batch raises its own error.'
+    with api_session() as api:
+        mock_batch_reply(api, [
+            {'id': 1, 'result': ['a']},
+            {'id': 2, 'error': {'code': -32602, 'message': 'Invalid params.', 'data': 'nope'}},
+        ])
+        with api.batch() as batch:
+            a = batch.call('host.get', filter=dict(name='a'))
+            b = batch.call('host.get', filter=dict(name='b'))
+        assert a.result == ['a']
+        with raises(ApiException) as cm:
+            b.reply
+        assert cm.value.code == -32602
+
+
+def test_batch3():
+    'Large batches are split into chunks.'
+    with api_session() as api:
+        mock_batch_reply(api, [])
+        api.responses([], size=2)
+        assert api._session.post.call_count == 1
+        with raises(ApiException):
+            api.responses([('host.get', dict())] * 5, size=2)
+        # login + 3 chunks
+        assert api._session.post.call_count == 4
+
+
+def test_hosts_by_name1():
+    'Bulk name lookups use one query and report missing & ambiguous names.'
+    with api_session() as api:
+        api.mock_reply(result=[
+            {"hostid": "1", "name": "a"},
+            {"hostid": "2", "name": "b"},
+            {"hostid": "3", "name": "b"},
+        ])
+        hosts = api.hosts_by_name(['a', 'b', 'c'])
+        assert hosts['a'].id == '1'
+        assert hosts.missing == ['c']
+        assert ['2', '3'] == [i.id for i in hosts.ambiguous['b']]
+        params = sent_params(api._session.post.call_args)
+        assert params['filter'] == {'name': ['a', 'b', 'c']}
+
+
+def test_iter1():
+    'Iterating fetches ids first and then full objects a page at a time.'
+    with api_session() as api:
+        api.mock_replies(
+            [{"hostid": "3"}, {"hostid": "1"}, {"hostid": "2"}],
+            [{"hostid": "1", "name": "a"}, {"hostid": "2", "name": "b"}],
+            [{"hostid": "3", "name": "c"}],
+        )
+        hosts = api.iter_hosts(page_size=2)
+        assert ['a', 'b', 'c'] == [i.name.val for i in hosts]
+        params = sent_params(api._session.post.call_args)
+        assert params['hostids'] == [3]
+
+
+def test_iter2():
+    'Events are paged by eventid_from.'
+    with api_session() as api:
+        api.mock_replies(
+            [{"eventid": "1"}, {"eventid": "5"}],
+            [{"eventid": "7"}],
+        )
+        events = api.iter_events(page_size=2, selectHosts=[])
+        assert ['1', '5', '7'] == [i.id for i in events]
+        params = sent_params(api._session.post.call_args)
+        assert params['eventid_from'] == 6
+
+
+def test_iter3():
+    'Iterating rejects stream & as_frame, whose results cannot be paged.'
+    with api_session() as api:
+        for name in ('stream', 'as_frame'):
+            with raises(ApiException):
+                next(api.iter_hosts(**{name: True}))
+        assert api._session.post.call_count == 1
+
+
+def test_stream1():
+    'Streamed replies yield each result element as it is decoded.'
+    with api_session() as api:
+        body = json.dumps(dict(jsonrpc='2.0', result=[
+            {"hostid": "1", "name": "café"},
+            {"hostid": "22", "name": "b"},
+        ], id=1), ensure_ascii=False).encode('utf-8')
+        chunks = [body[i:i + 5] for i in range(0, len(body), 5)]
+        api._session.post.return_value = Mock(iter_content=Mock(return_value=iter(chunks)))
+        hosts = api.hosts(stream=True)
+        assert ['1', '22'] == [i.id for i in hosts]
+        assert api._session.post.call_args[1]['stream']
+
+
+def test_stream2():
+    'Streamed error replies raise ApiException.'
+    with api_session() as api:
+        body = b'{"jsonrpc": "2.0", "error": {"code": -32602, "message": "Invalid params.", "data": "nope"}, "id": 1}'
+        api._session.post.return_value = Mock(iter_content=Mock(return_value=iter([body[:30], body[30:]])))
+        with raises(ApiException) as cm:
+            list(api.stream('host.get'))
+        assert cm.value.code == -32602
+
+
+def test_cache1():
+    'Cached reads are served locally until a write to the same type.'
+    with api_session() as api:
+        api._cache = ResponseCache()
+        api.mock_reply(result=[{"groupid": "1", "name": "g1"}])
+        assert api.group('g1').id == '1'
+        assert api.group('g1').id == '1'
+        assert api._session.post.call_count == 2
+        api.mock_reply(result={"groupids": ["1"]})
+        api.response('hostgroup.update', groupid='1', name='g2')
+        api.mock_reply(result=[{"groupid": "1", "name": "g2"}])
+        assert api.group('g1').name.val == 'g2'
+        assert api._session.post.call_count == 4
+
+
+def test_cache2():
+    'Reads of live state always go to the server.'
+    with api_session() as api:
+        api._cache = ResponseCache()
+        api.mock_reply(result=[{"itemid": "7", "clock": "100", "value": "1"}])
+        api.response('history.get', itemids=[7])
+        api.response('history.get', itemids=[7])
+        api.response('item.get', itemids=[7])
+        api.response('item.get', itemids=[7])
+        assert api._session.post.call_count == 5
+        assert api._cache.hits == 0
+
+
+def test_identity1():
+    'Embedded references and separate gets share one instance per id.'
+    with api_session() as api:
+        api.mock_reply(result=[
+            {"triggerid": "1", "description": "a", "hosts": [{"hostid": "45", "name": "h1"}]},
+            {"triggerid": "2", "description": "b", "hosts": [{"hostid": "45", "name": "h1"}]},
+        ])
+        t1, t2 = api.triggers()
+        assert t1.hosts[0] is t2.hosts[0]
+        api.mock_reply(result=[{"hostid": "45", "name": "h1", "status": "1"}])
+        host = api.host('h1')
+        assert host is t1.hosts[0]
+        assert host.status.val == 1
+
+
+def test_payload_ids1():
+    'Calls from several threads get distinct JSON-RPC ids.'
+    with api_session() as api:
+        with ThreadPoolExecutor(8) as pool:
+            ids = list(pool.map(lambda i: api._payload('host.get', {})['id'], range(2000)))
+        assert len(set(ids)) == 2000
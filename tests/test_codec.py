@@ -0,0 +1,14 @@
+from mock import patch
+from xibbaz import codec
+
+
+def test_loads1():
+    'Decodes straight from bytes.'
+    assert {'a': ['é', 1]} == codec.loads('{"a": ["é", 1]}'.encode('utf-8'))
+
+
+def test_fallback1():
+    'Falls back to the standard library when no fast codec is installed.'
+    with patch.object(codec, 'orjson', None), patch.object(codec, 'ujson', None):
+        assert {'a': 1} == codec.loads(b'{"a": 1}')
+        assert '{\n  "a": "x"\n}' == codec.dumps(dict(a=object()), indent=2, default=lambda i: 'x')
@@ -0,0 +1,30 @@
+from pytest import raises
+from xibbaz import ApiException
+from xibbaz.objects import Event
+from . import api_session, sent_params
+
+
+def test_sliced1():
+    'Sliced event fetches cover the range in order, growing quiet slices.'
+    with api_session() as api:
+        api.mock_replies(
+            [{"eventid": "1", "clock": "50"}, {"eventid": "2", "clock": "60"}],
+            [],
+            [{"eventid": "3", "clock": "900"}],
+        )
+        events = api.events(time_from=0, time_till=1000, slice=100, workers=1, source=0)
+        assert [i.id for i in events] == ['1', '2', '3']
+        calls = [sent_params(i) for i in api._session.post.call_args_list[1:]]
+        assert [(i['time_from'], i['time_till']) for i in calls] == [(0, 99), (100, 499), (500, 1000)]
+        assert calls[0]['sortfield'] == ['clock', 'eventid']
+        assert calls[0]['source'] == 0
+
+
+def test_sliced2():
+    'Slices shrink when replies are big, but no further than SLICE_MIN.'
+    assert Event._next_slice(3600, Event.SLICE_TARGET_SIZE * 2, 0.1) == 1800
+    assert Event._next_slice(3600, 10, Event.SLICE_TARGET_SECONDS * 2) == 1800
+    assert Event._next_slice(100, 10 ** 6, 0.1) == Event.SLICE_MIN
+    with api_session() as api:
+        with raises(ApiException):
+            list(api.events(slice=60))
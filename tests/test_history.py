@@ -0,0 +1,226 @@
+import os
+import time
+from datetime import timedelta
+import numpy
+import pytest
+from mock import patch
+from pytest import importorskip
+from xibbaz.historystore import HistoryStore
+from xibbaz.objects import Item
+from . import api_session, sent_params
+
+
+def rows(itemid, *samples):
+    return [dict(itemid=str(itemid), clock=str(c), ns=str(n), value=str(v)) for c, n, v in samples]
+
+
+def test_history_array1():
+    'Pages by clock until the range is covered, skipping repeated samples.'
+    with api_session() as api:
+        item = Item(api, itemid='7', value_type='0')
+        api.mock_replies(
+            rows(7, (100, 0, 1.5), (101, 5, 2.5), (101, 9, 3.5)),
+            rows(7, (101, 5, 2.5), (101, 9, 3.5), (102, 0, 4.5)),
+            rows(7, (102, 0, 4.5)),
+        )
+        hist = item.history_array(100, 200, page_size=3)
+        assert list(hist.clock) == [100, 101, 101, 102]
+        assert list(hist.ns) == [0, 5, 9, 0]
+        assert hist.value.dtype == numpy.float64
+        assert list(hist.value) == [1.5, 2.5, 3.5, 4.5]
+        calls = api._session.post.call_args_list[1:]
+        assert [sent_params(i)['time_from'] for i in calls] == [100, 101, 102]
+        assert sent_params(calls[0])['time_till'] == 200
+        assert sent_params(calls[0])['sortorder'] == 'ASC'
+
+
+def test_history_array2():
+    'Full pages within one second grow the page instead of looping.'
+    with api_session() as api:
+        item = Item(api, itemid='7', value_type='3')
+        api.mock_replies(
+            rows(7, (100, 1, 1), (100, 2, 2)),
+            rows(7, (100, 1, 1), (100, 2, 2)),
+            rows(7, (100, 1, 1), (100, 2, 2), (100, 3, 3)),
+        )
+        hist = item.history_array(page_size=2)
+        assert hist.value.dtype == numpy.uint64
+        assert list(hist.value) == [1, 2, 3]
+        calls = api._session.post.call_args_list[1:]
+        assert [sent_params(i)['limit'] for i in calls] == [2, 2, 4]
+
+
+def test_history_many1():
+    'One query per value_type, split back out per item.'
+    with api_session() as api:
+        items = [
+            Item(api, itemid='1', value_type='0'),
+            Item(api, itemid='2', value_type='3'),
+            Item(api, itemid='3', value_type='0'),
+            Item(api, itemid='4', value_type='0'),
+        ]
+        api.mock_replies(
+            rows(3, (100, 0, 0.5)) + rows(1, (100, 0, 1.5), (160, 0, 2.5)),
+            rows(2, (100, 0, 7)),
+        )
+        hists = api.history(items, 100, 200, workers=1)
+        calls = api._session.post.call_args_list[1:]
+        assert [(sent_params(i)['history'], sent_params(i)['itemids']) for i in calls] == [(0, ['1', '3', '4']), (3, ['2'])]
+        assert list(hists[1].value) == [1.5, 2.5]
+        assert list(hists[1].clock) == [100, 160]
+        assert list(hists[2].value) == [7]
+        assert list(hists[3].value) == [0.5]
+        assert len(hists[4]) == 0
+
+
+def test_history_frame1():
+    'Long format frame of every item sample.'
+    importorskip('pandas')
+    with api_session() as api:
+        items = [Item(api, itemid='1', value_type='0'), Item(api, itemid='2', value_type='0')]
+        api.mock_reply(result=rows(2, (100, 0, 0.5)) + rows(1, (100, 0, 1.5), (160, 0, 2.5)))
+        df = api.history(items, 100, 200, as_frame=True)
+        assert list(df.columns) == ['itemid', 'clock', 'ns', 'value']
+        assert list(df['itemid']) == [1, 1, 2]
+        assert list(df['value']) == [1.5, 2.5, 0.5]
+
+
+def trend_rows(itemid, *samples):
+    return [dict(itemid=str(itemid), clock=str(c), num=str(n), value_min=str(lo), value_avg=str(avg), value_max=str(hi))
+            for c, n, lo, avg, hi in samples]
+
+
+def test_trends1():
+    'Trends are fetched a window at a time into the same History format.'
+    with api_session() as api:
+        item = Item(api, itemid='7', value_type='3')
+        api.mock_replies(
+            [],
+            trend_rows(7, (3600, 60, 1, 2, 3)),
+            [],
+            trend_rows(7, (3 * 3600, 60, 4, 5.5, 7)),
+        )
+        hist = item.trends(0, 3 * 3600, page_size=1)
+        assert hist.period == 3600
+        assert list(hist.clock) == [3600, 3 * 3600]
+        assert list(hist.value) == [2.0, 5.5]
+        assert list(hist.value_max) == [3, 7]
+        assert list(hist.num) == [60, 60]
+        calls = api._session.post.call_args_list[1:]
+        assert [(sent_params(i)['time_from'], sent_params(i)['time_till']) for i in calls] == [
+            (0, 3599), (3600, 7199), (7200, 10799), (10800, 10800)]
+
+
+def test_series1():
+    'Long windows and windows past history retention read trends.'
+    with api_session() as api:
+        now = int(time.time())
+        item = Item(api, itemid='7', value_type='0', history='7d', trends='365d')
+        assert not item._use_trends(now - 3600, None, None)
+        assert item._use_trends(now - 3600, None, timedelta(hours=1))
+        assert item._use_trends(now - 30 * 86400, now - 29 * 86400, None)
+        assert item._use_trends(now - 6 * 86400, None, None) is False
+        assert not Item(api, itemid='8', value_type='4')._use_trends(0, None, None)
+        assert not Item(api, itemid='9', value_type='0', trends='0')._use_trends(now - 90 * 86400, None, None)
+        api.mock_reply(result=trend_rows(7, (now - now % 3600, 60, 1, 2, 3)))
+        assert item.series(now - 90 * 86400).period == 3600
+
+
+def test_series2():
+    'Without a start, series reads raw history unless asked for trends.'
+    with api_session() as api:
+        item = Item(api, itemid='7', value_type='0', history='7d', trends='365d')
+        assert not item._use_trends(None, None, None)
+        assert item._use_trends(None, None, timedelta(hours=1))
+        api.mock_reply(result=rows(7, (100, 0, 1.5)))
+        hist = item.series()
+        assert hist.period is None
+        assert list(hist.value) == [1.5]
+        assert 'time_from' not in sent_params(api._session.post.call_args)
+
+
+def test_history_store1(tmp_path):
+    'Stored history is only topped up with newer samples and served as views.'
+    with api_session() as api:
+        api._history_store = HistoryStore(str(tmp_path))
+        item = Item(api, itemid='7', value_type='0')
+        api.mock_reply(result=rows(7, (100, 0, 1.5), (150, 0, 2.5)))
+        hist = item.history_array(100, 200)
+        assert list(hist.value) == [1.5, 2.5]
+        api.mock_reply(result=rows(7, (250, 0, 3.5)))
+        hist = item.history_array(120, 300)
+        assert sent_params(api._session.post.call_args)['time_from'] == 201
+        assert list(hist.clock) == [150, 250]
+        assert isinstance(hist.clock, numpy.memmap)
+        calls = api._session.post.call_count
+        assert list(item.history_array(100, 300).value) == [1.5, 2.5, 3.5]
+        assert api._session.post.call_count == calls
+        api.mock_reply(result=rows(7, (50, 0, 0.5), (100, 0, 1.5)))
+        assert list(item.history_array(50, 120).value) == [0.5, 1.5]
+
+
+def test_history_store2(tmp_path):
+    'Refetches & appends leave earlier views unchanged.'
+    with api_session() as api:
+        store = api._history_store = HistoryStore(str(tmp_path))
+        store.MIN_CAPACITY = 2
+        item = Item(api, itemid='7', value_type='3')
+        api.mock_reply(result=rows(7, (100, 0, 1), (150, 0, 2)))
+        first = item.history_array(100, 200)
+        api.mock_reply(result=rows(7, (250, 0, 3)))
+        item.history_array(100, 300)
+        api.mock_reply(result=rows(7, (60, 0, 9)))
+        last = item.history_array(50, 300)
+        assert list(first.clock) == [100, 150]
+        assert list(first.value) == [1, 2]
+        assert list(last.value) == [9]
+        store.compact()
+        assert list(first.value) == [1, 2]
+        assert list(item.history_array(50, 300).value) == [9]
+        assert len(list(tmp_path.glob('*.dat'))) == 1
+
+
+def test_history_store3(tmp_path):
+    'Views of many items share one memory map.'
+    with api_session() as api:
+        api._history_store = HistoryStore(str(tmp_path))
+        items = [Item(api, itemid=str(i), value_type='0') for i in range(1, 201)]
+        api.mock_reply(result=[j for i in range(1, 201) for j in rows(i, (100, 0, i))])
+        fds = len(os.listdir('/proc/self/fd'))
+        histories = api.history(items, 100, 200)
+        assert len(os.listdir('/proc/self/fd')) - fds <= 1
+        assert [histories[i].value[0] for i in (1, 200)] == [1, 200]
+
+
+def test_history_store4(tmp_path):
+    'An interrupted save leaves the stored columns as they were.'
+    with api_session() as api:
+        api._history_store = HistoryStore(str(tmp_path))
+        item = Item(api, itemid='7', value_type='0')
+        api.mock_reply(result=rows(7, (100, 0, 1.5)))
+        item.history_array(100, 200)
+        api.mock_reply(result=rows(7, (250, 5, 2.5)))
+        with patch('xibbaz.historystore.os.replace', side_effect=OSError):
+            with pytest.raises(OSError):
+                item.history_array(100, 300)
+        api._history_store = HistoryStore(str(tmp_path))
+        api.mock_reply(result=rows(7, (250, 5, 2.5), (260, 0, 3.5)))
+        hist = item.history_array(100, 300)
+        assert list(hist.clock) == [100, 250, 260]
+        assert list(hist.ns) == [0, 5, 0]
+        assert list(hist.value) == [1.5, 2.5, 3.5]
+
+
+def test_history_store5(tmp_path):
+    'Samples stamped after local now are stored once, by the next top-up.'
+    with api_session() as api:
+        api._history_store = HistoryStore(str(tmp_path))
+        item = Item(api, itemid='7', value_type='3')
+        now = int(time.time())
+        api.mock_reply(result=rows(7, (now - 10, 0, 1), (now + 5, 0, 2)))
+        assert list(item.history_array(now - 20).value) == [1]
+        with patch('xibbaz.historystore.time.time', return_value=now + 10):
+            api.mock_reply(result=rows(7, (now + 5, 0, 2)))
+            hist = item.history_array(now - 20)
+        assert list(hist.clock) == [now - 10, now + 5]
+        assert sent_params(api._session.post.call_args)['time_from'] > now - 10
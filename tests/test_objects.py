@@ -0,0 +1,170 @@
+import json
+from mock import Mock
+from datetime import datetime
+from pytest import raises
+from xibbaz import ApiException
+from xibbaz.objects import Host, Item, Trigger
+from . import api_session, sent_params, sent_payload
+
+
+def test_lazy1():
+    'Properties are only created when accessed.'
+    with api_session() as api:
+        host = Host(api, hostid='45', name='h1', status='1', errors_from='1388867607')
+        assert host.status.val == 1
+        assert set(host._props.loaded()) == set(['status'])
+        assert host.json() == dict(hostid='45', name='h1', status=1, errors_from='2014-01-04T20:33:27')
+
+
+def test_lazy2():
+    'Methods win over properties of the same name.'
+    with api_session() as api:
+        item = Item(api, itemid='1', key_='k', value_type='3', history='90d')
+        assert callable(item.history)
+        assert item._props['history'].val == '90d'
+
+
+def test_lazy3():
+    'None from the server stays None rather than being coerced.'
+    with api_session() as api:
+        host = Host(api, hostid='1', name=None, status=None)
+        assert host.name.val is None
+        assert host.status.val is None
+        assert host.json()['name'] is None
+
+
+def test_fields1():
+    'Projected gets only output the given fields & selects.'
+    with api_session() as api:
+        api.mock_reply(result=[{"itemid": "1", "key_": "k", "lastvalue": "2"}])
+        items = api.items(fields=['key_', 'lastvalue'], selects={'Hosts': ['name']})
+        params = sent_params(api._session.post.call_args)
+        assert params['output'] == ['itemid', 'key_', 'lastvalue']
+        assert params['selectHosts'] == ['name']
+        assert 'selectTriggers' not in params
+        assert set(items[0]._props) == set(['itemid', 'key_', 'lastvalue'])
+
+
+def test_profile1():
+    'Named profiles map to output & selects.'
+    with api_session() as api:
+        api.mock_reply(result=[])
+        api.items(profile='light')
+        params = sent_params(api._session.post.call_args)
+        assert 'key_' in params['output']
+        assert not [i for i in params if i.startswith('select')]
+        api.items(profile='full')
+        assert 'selectTriggers' in sent_params(api._session.post.call_args)
+
+
+def test_prefetch1():
+    'Prefetching a relation uses one query and splits results per object.'
+    with api_session() as api:
+        api.mock_reply(result=[{"hostid": "1", "name": "h1"}, {"hostid": "2", "name": "h2"}])
+        h1, h2 = api.hosts()
+        api.mock_reply(result=[
+            {"triggerid": "10", "description": "t1", "hosts": [{"hostid": "1"}]},
+            {"triggerid": "11", "description": "t2", "hosts": [{"hostid": "1"}, {"hostid": "2"}]},
+        ])
+        api.prefetch([h1, h2], 'triggers')
+        params = sent_params(api._session.post.call_args)
+        assert params['hostids'] == ['1', '2']
+        assert params['selectHosts'] == ['hostid']
+        assert ['10', '11'] == [i.id for i in h1.triggers]
+        assert ['11'] == [i.id for i in h2.triggers]
+        assert not hasattr(h1.triggers[0], '_hosts')
+        assert api._session.post.call_count == 3
+
+
+def test_prefetch2():
+    'Applications are matched to hosts by their single selected host.'
+    with api_session() as api:
+        host = Host(api, hostid='1', name='h1')
+        api.mock_reply(result=[{"applicationid": "5", "name": "a", "host": {"hostid": "1"}}])
+        api.prefetch([host], 'applications')
+        params = sent_params(api._session.post.call_args)
+        assert params['selectHost'] == ['hostid']
+        assert 'selectHosts' not in params
+        assert ['5'] == [i.id for i in host.applications]
+
+
+def test_prefetch3():
+    'Relations the related get cannot select back are loaded via our own get.'
+    with api_session() as api:
+        trigger = Trigger(api, triggerid='10', description='t')
+        api.mock_reply(result=[{"triggerid": "10", "groups": [{"groupid": "3", "name": "g"}]}])
+        api.prefetch([trigger], 'groups')
+        params = sent_params(api._session.post.call_args)
+        assert params['triggerids'] == ['10']
+        assert params['selectGroups'] == 'extend'
+        assert ['3'] == [i.id for i in trigger.groups]
+        with raises(ApiException):
+            api.prefetch([Trigger(api, triggerid='11')], 'groups', output=['name'])
+
+
+def test_prefetch4():
+    'Hosts of items are loaded via item.get, not by selecting back every item.'
+    with api_session() as api:
+        item = Item(api, itemid='7', name='i')
+        api.mock_reply(result=[{"itemid": "7", "hosts": [{"hostid": "1", "name": "h1"}]}])
+        api.prefetch([item], 'hosts')
+        payload = sent_payload(api._session.post.call_args)
+        assert payload['method'] == 'item.get'
+        assert payload['params']['selectHosts'] == 'extend'
+        assert ['1'] == [i.id for i in item.hosts]
+        assert not hasattr(item.hosts[0], '_items')
+
+
+def test_problems_related1():
+    'Problem events & triggers are loaded in bulk.'
+    with api_session() as api:
+        api.mock_replies(
+            [
+                {"eventid": "1", "object": "0", "objectid": "10"},
+                {"eventid": "2", "object": "0", "objectid": "11"},
+                {"eventid": "3", "object": "0", "objectid": "10"},
+            ],
+            [{"eventid": "1"}, {"eventid": "2"}, {"eventid": "3"}],
+            [
+                {"triggerid": "10", "description": "t1", "hosts": [{"hostid": "5", "host": "h", "name": "h"}]},
+                {"triggerid": "11", "description": "t2", "hosts": [{"hostid": "5", "host": "h", "name": "h"}]},
+            ],
+        )
+        problems = api.problems(with_events=True, with_triggers=True)
+        assert api._session.post.call_count == 4
+        assert ['1', '2', '3'] == [i.event.id for i in problems]
+        assert ['t1', 't2', 't1'] == [i.trigger.text for i in problems]
+        assert problems[0].trigger.hosts[0] is problems[1].trigger.hosts[0]
+        params = sent_params(api._session.post.call_args)
+        assert params['triggerids'] == ['10', '11']
+        assert params['expandDescription']
+
+
+def test_save1():
+    'Saving sends only changed properties to <api_name>.update.'
+    with api_session() as api:
+        host = Host(api, hostid='45', name='h1', status='0', host='h1')
+        assert host.save() is None
+        host.status.val = 1
+        api.mock_reply(result={"hostids": ["45"]})
+        host.save()
+        payload = sent_payload(api._session.post.call_args)
+        assert payload['method'] == 'host.update'
+        assert payload['params'] == dict(hostid='45', status=1)
+        assert not host.status.dirty
+
+
+def test_save_all1():
+    'Changes to many objects are sent as chunked array-param updates.'
+    with api_session() as api:
+        hosts = [Host(api, hostid=str(i), name='h', status='0') for i in range(5)]
+        items = [Item(api, itemid='9', status='0')]
+        for obj in hosts + items:
+            obj.status.val = 1
+        reply = [{"jsonrpc": "2.0", "id": i, "result": {}} for i in range(1, 4)]
+        api._session.post.return_value = Mock(content=json.dumps(reply).encode('utf-8'))
+        assert api.save_all(hosts + items, size=3) == 6
+        payload = sent_payload(api._session.post.call_args)
+        assert ['host.update', 'host.update', 'item.update'] == [i['method'] for i in payload]
+        assert [3, 2, 1] == [len(i['params']) for i in payload]
+        assert not [i for i in hosts + items if i.status.dirty]
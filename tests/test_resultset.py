@@ -0,0 +1,27 @@
+import numpy
+from pytest import importorskip
+from . import api_session
+
+
+def test_columns1():
+    'Columns are typed by property kind without building objects.'
+    with api_session() as api:
+        api.mock_reply(result=[
+            {"hostid": "1", "name": "a", "status": "0", "errors_from": "1388867607"},
+            {"hostid": "2", "name": "b", "status": "1"},
+        ])
+        rs = api.hosts(as_frame=True)
+        assert len(rs) == 2
+        assert rs['status'].dtype == numpy.int64
+        assert list(rs['name']) == ['a', 'b']
+        assert rs['errors_from'][0] == numpy.datetime64('2014-01-04T20:33:27')
+        assert numpy.isnat(rs['errors_from'][1])
+
+
+def test_frame1():
+    'Enums become labelled categoricals in a DataFrame.'
+    importorskip('pandas')
+    with api_session() as api:
+        api.mock_reply(result=[{"hostid": "1", "status": "0"}, {"hostid": "2", "status": "1"}])
+        df = api.hosts(as_frame=True).to_frame()
+        assert list(df['status']) == ['monitored host (default)', 'unmonitored host']
@@ -0,0 +1,106 @@
+from xibbaz.objects import Host
+from xibbaz.store import MetadataStore
+from . import api_session, sent_params
+
+
+def test_query1():
+    'Name lookups are loaded once and then served from the store.'
+    with api_session() as api:
+        api._store = MetadataStore(':memory:')
+        api.mock_reply(result=[{"hostid": "1", "name": "a"}, {"hostid": "2", "name": "b"}])
+        assert api.host('b').id == '2'
+        assert api.host('a').id == '1'
+        assert api._session.post.call_count == 3
+        params = sent_params(api._session.post.call_args)
+        assert 'filter' not in params
+        assert params['hostids'] == [1, 2]
+        assert 'selectGroups' not in params
+
+
+def test_query2():
+    'The first load is fetched a page of ids at a time.'
+    with api_session() as api:
+        store = api._store = MetadataStore(':memory:')
+        store.PAGE_SIZE = 2
+        api.mock_replies(
+            [{"hostid": "1"}, {"hostid": "2"}, {"hostid": "3"}],
+            [{"hostid": "1", "name": "a"}, {"hostid": "2", "name": "b"}],
+            [{"hostid": "3", "name": "c"}],
+        )
+        assert ['a', 'b', 'c'] == [i.name.val for i in api.hosts()]
+        pages = [sent_params(i)['hostids'] for i in api._session.post.call_args_list[2:]]
+        assert pages == [[1, 2], [3]]
+
+
+def test_miss1():
+    'Names & ids missing from the store are looked up on the server and stored.'
+    with api_session() as api:
+        api._store = MetadataStore(':memory:')
+        api.mock_replies(
+            [{"hostid": "1"}],
+            [{"hostid": "1", "name": "a"}],
+            [{"hostid": "2", "name": "b"}],
+        )
+        assert api.host('b').id == '2'
+        params = sent_params(api._session.post.call_args)
+        assert params['filter'] == dict(name=['b'])
+        assert api.host('b').id == '2'
+        assert api.hosts(hostids=[1, 2])[1].name.val == 'b'
+        assert api._session.post.call_count == 4
+
+
+def test_refresh1():
+    'Refreshing only fetches new ids and drops deleted ones.'
+    with api_session() as api:
+        store = api._store = MetadataStore(':memory:')
+        api.mock_reply(result=[{"hostid": "1", "name": "a"}, {"hostid": "2", "name": "b"}])
+        store.refresh(api, Host)
+        api.mock_replies(
+            [{"hostid": "2"}, {"hostid": "3"}],
+            [{"hostid": "3", "name": "c"}],
+        )
+        store.refresh(api, Host)
+        params = sent_params(api._session.post.call_args)
+        assert params['hostids'] == [3]
+        assert ['b', 'c'] == [i.name.val for i in api.hosts()]
+
+
+def test_refresh2():
+    'Once past full_age, a refresh refetches everything to pick up renames.'
+    with api_session() as api:
+        store = api._store = MetadataStore(':memory:', max_age=0, full_age=0, background=False)
+        api.mock_replies([{"hostid": "1"}], [{"hostid": "1", "name": "a"}])
+        store.refresh(api, Host)
+        api.mock_replies([{"hostid": "1"}], [{"hostid": "1", "name": "renamed"}])
+        assert api.host('renamed').id == '1'
+        assert sent_params(api._session.post.call_args)['hostids'] == [1]
+
+
+def test_unsupported1():
+    'Params the store cannot answer go to the server.'
+    with api_session() as api:
+        api._store = MetadataStore(':memory:')
+        api.mock_reply(result=[{"hostid": "1", "name": "a"}])
+        api.hosts(search=dict(name='a'))
+        assert api._session.post.call_count == 2
+
+
+def test_triggers1():
+    'Trigger lookups always go to the server.'
+    with api_session() as api:
+        api._store = MetadataStore(':memory:')
+        api.mock_reply(result=[{"triggerid": "7", "description": "t", "value": "1"}])
+        api.trigger(7)
+        api.trigger(7)
+        assert api._session.post.call_count == 3
+
+
+def test_refresh_async1():
+    'Background refreshes do not keep the process alive.'
+    with api_session() as api:
+        store = api._store = MetadataStore(':memory:')
+        api.mock_replies([{"hostid": "1"}], [{"hostid": "1", "name": "a"}])
+        thread = store.refresh_async(api, Host)
+        thread.join()
+        assert thread.daemon
+        assert [i.name.val for i in api.hosts()] == ['a']
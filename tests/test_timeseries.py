@@ -0,0 +1,77 @@
+import numpy
+from pytest import raises
+from xibbaz import ApiException
+from xibbaz.timeseries import History, aggregate, delta, rate
+
+
+def counter():
+    clock = numpy.array([0, 10, 20, 3600, 3610, 7300, 14400], numpy.int64)
+    value = numpy.array([5, 7, 3, 4, 10, 1, 2], numpy.uint64)
+    return History(clock, value)
+
+
+def test_delta1():
+    'Counter resets & long gaps yield no change, as Zabbix stores deltas.'
+    hist = counter()
+    d = delta(hist)
+    assert list(d.clock) == [10, 3600, 3610, 14400]
+    assert list(d.value) == [2, 1, 6, 1]
+    assert list(delta(hist, max_gap=60).clock) == [10, 3610]
+    assert list(rate(hist).value)[:2] == [0.2, 1 / 3580.0]
+
+
+def test_aggregate1():
+    'Fixed buckets, with empty ones only when filling.'
+    out = aggregate(counter(), 3600, stats=('min', 'max', 'avg', 'count', 'last', 'delta', 'rate'), percentiles=(50,))
+    assert list(out['clock']) == [0, 3600, 7200, 14400]
+    assert list(out['min']) == [3, 4, 1, 2]
+    assert list(out['avg']) == [5, 7, 1, 2]
+    assert list(out['count']) == [3, 2, 1, 1]
+    assert list(out['last']) == [3, 10, 1, 2]
+    assert list(out['delta']) == [2, 7, 0, 1]
+    assert out['rate'][1] == 7 / 3590.0
+    assert numpy.isnan(out['rate'][2])
+    assert list(out['p50']) == [5, 7, 1, 2]
+    out = aggregate(counter(), '1h', stats=('avg', 'count'), fill=True)
+    assert list(out['clock']) == [0, 3600, 7200, 10800, 14400]
+    assert list(out['count']) == [3, 2, 1, 0, 1]
+    assert numpy.isnan(out['avg'][3])
+
+
+def test_aggregate2():
+    'Calendar buckets, in UTC.'
+    day = 86400
+    hist = History(numpy.array([0, day, 5 * day, 40 * day], numpy.int64), numpy.ones(4))
+    assert list(aggregate(hist, 'day', stats=('count',))['count']) == [1, 1, 1, 1]
+    week = aggregate(hist, 'week', stats=('count',))
+    assert list(week['clock']) == [-3 * day, 4 * day, 39 * day]
+    month = aggregate(hist, 'month', stats=('count',), fill=True)
+    assert list(month['clock']) == [0, 31 * day]
+    assert list(month['count']) == [3, 1]
+
+
+def test_aggregate3():
+    'Trends aggregate from their own min, max & counts.'
+    hist = History(
+        numpy.array([0, 3600], numpy.int64),
+        numpy.array([2.0, 6.0]),
+        value_min = numpy.array([1.0, 0.5]),
+        value_max = numpy.array([3.0, 9.0]),
+        num = numpy.array([60, 20], numpy.int64),
+        period = 3600,
+    )
+    out = aggregate(hist, 'day', stats=('min', 'max', 'avg', 'count'))
+    assert list(out['min']) == [0.5]
+    assert list(out['max']) == [9.0]
+    assert list(out['avg']) == [3.0]
+    assert list(out['count']) == [80]
+
+
+def test_aggregate4():
+    'Unknown stats & numeric stats of text raise ApiException.'
+    with raises(ApiException):
+        aggregate(counter(), 60, stats=('median',))
+    text = History(numpy.array([0], numpy.int64), numpy.array(['a'], object))
+    assert list(aggregate(text, 60, stats=('last', 'count'))['last']) == ['a']
+    with raises(ApiException):
+        aggregate(text, 60, stats=('avg',))
@@ -0,0 +1,121 @@
+import asyncio
+from mock import patch
+from xibbaz import AsyncApi
+from xibbaz.watch import EventStream, ProblemTracker
+from . import api_session, mock_replies, sent_payload
+
+
+def event(id, objectid, object='0'):
+    return dict(eventid=str(id), source='0', object=object, objectid=str(objectid), clock='1388867607', ns='0', value='1')
+
+
+def test_event_stream1():
+    'Polls continue from the last event id with triggers loaded in bulk.'
+    with api_session() as api:
+        stream = EventStream(api, source=0)
+        api.mock_replies(
+            [{"eventid": "41"}],
+            [event(42, 7), event(43, 8), event(44, 7), event(45, 100, object='4')],
+            [{"triggerid": "7", "description": "t7", "hosts": [{"hostid": "1", "name": "h1"}]},
+             {"triggerid": "8", "description": "t8", "hosts": []}],
+        )
+        events = stream.poll()
+        assert [i.id for i in events] == ['42', '43', '44', '45']
+        assert events[0].trigger.description.val == 't7'
+        assert events[0].trigger is events[2].trigger
+        assert events[3].trigger is None
+        latest, get, triggers = [sent_payload(i) for i in api._session.post.call_args_list[1:]]
+        assert latest['params']['sortorder'] == 'DESC'
+        assert get['params']['eventid_from'] == 42
+        assert get['params']['source'] == 0
+        assert 'selectHosts' not in get['params']
+        assert triggers['method'] == 'trigger.get'
+        assert triggers['params']['triggerids'] == ['7', '8']
+        api.mock_replies([])
+        assert stream.poll() == []
+        assert sent_payload(api._session.post.call_args)['params']['eventid_from'] == 46
+
+
+def test_event_stream2():
+    'The poll interval shrinks under load and backs off when quiet.'
+    with api_session() as api:
+        stream = EventStream(api, after=10, page_size=2, min_interval=1, max_interval=4, triggers=False)
+        api.mock_replies([event(11, 1), event(12, 1)])
+        stream.poll()
+        assert stream.interval == 0
+        api.mock_replies([event(13, 1)])
+        stream.poll()
+        assert stream.interval == 1
+        for expected in (2, 4, 4):
+            api.mock_replies([])
+            stream.poll()
+            assert stream.interval == expected
+
+
+def test_event_stream3():
+    'Async iteration with an AsyncApi.'
+    with patch('xibbaz.api.requests.session') as session:
+        api = AsyncApi('http://xibbaz', session)
+        mock_replies(session, [event(5, 100, object='4'), event(6, 100, object='4')])
+        stream = EventStream(api, after=4, page_size=2)
+        async def first_two():
+            events = []
+            async for i in stream:
+                events.append(i.id)
+                if len(events) == 2:
+                    return events
+        loop = asyncio.new_event_loop()
+        assert loop.run_until_complete(first_two()) == ['5', '6']
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        assert stream.last_id == 6
+        api.close()
+
+
+def problem(id, severity='3', acknowledged='0', r_eventid='0', r_clock='0'):
+    return dict(eventid=str(id), objectid='7', clock='100', name='p', severity=severity,
+                acknowledged=acknowledged, r_eventid=r_eventid, r_clock=r_clock)
+
+
+def test_problem_tracker1():
+    'Polls report only added, resolved & changed problems.'
+    with api_session() as api:
+        fields = ProblemTracker.FIELDS + ('name', 'severity', 'acknowledged', 'suppressed')
+        tracker = ProblemTracker(api, groupids=4, time_from=50, fields=fields)
+        api.mock_replies([problem(1), problem(2)])
+        changes = tracker.poll()
+        assert [i['eventid'] for i in changes.added] == ['1', '2']
+        params = sent_payload(api._session.post.call_args)['params']
+        assert params['output'] == list(fields)
+        assert params['groupids'] == 4
+        assert params['time_from'] == 50
+        assert 'recent' not in params
+        api.mock_replies([problem(1), problem(2)])
+        assert not tracker.poll()
+        api.mock_replies([problem(2, acknowledged='1'), problem(3)])
+        changes = tracker.poll()
+        assert [i['eventid'] for i in changes.added] == ['3']
+        assert changes.changed == [dict(eventid='2', acknowledged='1')]
+        assert changes.json()['resolved'] == [dict(eventid='1', r_eventid='0', r_clock='0')]
+
+
+def test_problem_tracker2():
+    'With recent, resolved problems are reported once.'
+    with api_session() as api:
+        tracker = ProblemTracker(api, recent=True)
+        api.mock_replies([problem(1), problem(2)])
+        tracker.poll()
+        params = sent_payload(api._session.post.call_args)['params']
+        assert params['recent'] is True
+        assert params['output'] == list(ProblemTracker.FIELDS)
+        assert 'acknowledged' not in params['output']
+        api.mock_replies([problem(1, r_eventid='9', r_clock='200'), problem(2), problem(5, r_eventid='6', r_clock='150')])
+        changes = tracker.poll()
+        assert changes.json()['resolved'] == [
+            dict(eventid='1', r_eventid='9', r_clock='200'),
+            dict(eventid='5', r_eventid='6', r_clock='150'),
+        ]
+        assert not changes.added and not changes.changed
+        api.mock_replies([problem(1, r_eventid='9', r_clock='200'), problem(2)])
+        assert not tracker.poll()
+        api.mock_replies([problem(2)])
+        assert not tracker.poll()
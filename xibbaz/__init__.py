@@ -4,13 +4,17 @@ A pythonic interface to the Zabbix API.
 
 import os
 from .api import Api, ApiException
+from .aio import AsyncApi
 
 
-def login(url=None, username=None, password=None):
+def login(url=None, username=None, password=None, store=None):
     """
     Helper around common way to get credentials and log in.
     """
-    api = Api(url or os.environ['ZABBIX_API'])
+    if store is None and os.environ.get('ZABBIX_CACHE'):
+        from .store import MetadataStore
+        store = MetadataStore(os.environ['ZABBIX_CACHE'])
+    api = Api(url or os.environ['ZABBIX_API'], store=store)
     if username is None:
         if 'ZABBIX_USER' in os.environ:
             username = os.environ['ZABBIX_USER']
@@ -0,0 +1,230 @@
+"""
+An asyncio flavor of the Zabbix API client.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from .api import Api, ApiException, _lookup_params, _resolve_queries, _resolved, one_only
+from . import objects
+
+__all__ = [
+    'AsyncApi',
+]
+
+
+class AsyncApi(object):
+    """
+    Zabbix API client / session whose calls are awaitable, wrapping an
+    `Api` (as `sync`) whose calls run on a thread pool so many independent
+    reads can overlap, with at most `concurrency` in flight at once:
+
+        api = AsyncApi('https://zabbix')
+        await api.login(user, password)
+        hosts = await api.hosts(groupids=42)
+        problems = await asyncio.gather(*[i.aproblems() for i in hosts])
+
+    Objects fetched this way carry `sync`, so their plain relations, writes
+    & history block as usual, while the awaitable variants (`ahosts()`,
+    `aitems()`, ...) go through this `AsyncApi`.  Calls with no awaitable
+    version here, such as `iter_hosts` or `save_all`, are made via `sync`.
+    """
+
+    def __init__(self, server, session=None, concurrency=8, cache=None, identity_map=True):
+        self.sync = Api(server, session, cache, identity_map)
+        self.sync._async = self
+        self._concurrency = concurrency
+        self._semaphore = None
+        self._executor = ThreadPoolExecutor(concurrency)
+
+
+    async def login(self, user, password):
+        """
+        Return true if able to authenticate, false otherwise.  Session
+        key is saved in `sync` for future requests.
+        """
+        try:
+            self.sync._auth = (await self.response('user.login', user=user, password=password)).get('result')
+        except ApiException as e:
+            if e.code != ApiException.FAILED_AUTH:
+                raise
+        return bool(self.sync._auth)
+
+
+    async def response(self, method, **params):
+        """
+        Get "raw" response from zabbix server.
+        """
+        # Created here so it binds to the running loop.
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._concurrency)
+        async with self._semaphore:
+            return await self._run(partial(self.sync.response, method, **params))
+
+
+    def close(self):
+        """
+        Release the worker threads.
+        """
+        self._executor.shutdown(wait=False)
+
+
+    async def _run(self, call):
+        """
+        Await blocking `call` on the thread pool.
+        """
+        return await asyncio.get_running_loop().run_in_executor(self._executor, call)
+
+
+    async def _resolve(self, Class, names):
+        """
+        Awaitable `Api._resolve`, with its queries made concurrently.
+        """
+        names = list(names)
+        queries = _resolve_queries(Class, names)
+        results = await asyncio.gather(*[Class.aget(self, **params) for _, params in queries])
+        return _resolved(names, queries, results)
+
+
+    async def history(self, items, ts_from=None, ts_to=None, as_frame=False, page_size=None, workers=4):
+        """
+        Awaitable `Api.history`, run on the thread pool.
+        """
+        return await self._run(partial(self.sync.history, items, ts_from, ts_to, as_frame, page_size, workers))
+
+
+    async def host(self, name_or_id):
+        """
+        `Host` by id or name.
+        """
+        return one_only(await self.hosts(**_lookup_params(objects.Host, name_or_id)))
+
+
+    async def hosts(self, **params):
+        """
+        Wrapper around `Host.aget`.
+        """
+        return await objects.Host.aget(self, **params)
+
+
+    async def hosts_by_name(self, names):
+        """
+        `Resolved` map of each id or name in `names` to its `Host`.
+        """
+        return await self._resolve(objects.Host, names)
+
+
+    async def group(self, name_or_id):
+        """
+        `Group` by id or name.
+        """
+        return one_only(await self.groups(**_lookup_params(objects.Group, name_or_id)))
+
+
+    async def groups(self, **params):
+        """
+        Wrapper around `Group.aget`.
+        """
+        return await objects.Group.aget(self, **params)
+
+
+    async def groups_by_name(self, names):
+        """
+        `Resolved` map of each id or name in `names` to its `Group`.
+        """
+        return await self._resolve(objects.Group, names)
+
+
+    async def template(self, name_or_id):
+        """
+        `Template` by id or name.
+        """
+        return one_only(await self.templates(**_lookup_params(objects.Template, name_or_id)))
+
+
+    async def templates(self, **params):
+        """
+        Wrapper around `Template.aget`.
+        """
+        return await objects.Template.aget(self, **params)
+
+
+    async def templates_by_name(self, names):
+        """
+        `Resolved` map of each id or name in `names` to its `Template`.
+        """
+        return await self._resolve(objects.Template, names)
+
+
+    async def item(self, name_or_id):
+        """
+        `Item` by id or name.
+        """
+        return one_only(await self.items(**_lookup_params(objects.Item, name_or_id)))
+
+
+    async def items(self, **params):
+        """
+        Wrapper around `Item.aget`.
+        """
+        return await objects.Item.aget(self, **params)
+
+
+    async def items_by_name(self, names):
+        """
+        `Resolved` map of each id or name in `names` to its `Item`.
+        """
+        return await self._resolve(objects.Item, names)
+
+
+    async def trigger(self, id):
+        """
+        `Trigger` by id.
+        """
+        return one_only(await self.triggers(triggerids=id))
+
+
+    async def triggers(self, **params):
+        """
+        Wrapper around `Trigger.aget`.
+        """
+        return await objects.Trigger.aget(self, **params)
+
+
+    async def application(self, name_or_id):
+        """
+        `Application` by id or name.
+        """
+        return one_only(await self.applications(**_lookup_params(objects.Application, name_or_id)))
+
+
+    async def applications(self, **params):
+        """
+        Wrapper around `Application.aget`.
+        """
+        return await objects.Application.aget(self, **params)
+
+
+    async def event(self, id):
+        """
+        `Event` by id.
+        """
+        return one_only(await self.events(eventids=id))
+
+
+    async def events(self, **params):
+        """
+        Wrapper around `Event.aget`.
+        """
+        return await objects.Event.aget(self, **params)
+
+
+    async def problems(self, with_events=False, with_triggers=False, **params):
+        """
+        Wrapper around `Problem.aget`, optionally loading the `event` and/or
+        `trigger` of every problem in bulk.
+        """
+        problems = await objects.Problem.aget(self, **params)
+        if with_events or with_triggers:
+            await objects.Problem.aload_related(self, problems, with_events, with_triggers)
+        return problems
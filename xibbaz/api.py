@@ -5,9 +5,12 @@ A pythonic interface to the Zabbix APself.
 import os
 import sys
 import requests
-import json
 import re
-from . import objects
+import threading
+from contextlib import contextmanager
+from . import codec, objects
+from .cache import ResponseCache
+from .identity import IdentityMap
 
 __all__ = [
     'Api',
@@ -37,14 +40,40 @@ class Api(object):
     Zabbix API client / session
     """
 
-    def __init__(self, server, session=None):
+    # Max number of calls per JSON-RPC batch request.
+    BATCH_SIZE = 100
+
+    # Bytes read at a time from streamed replies.
+    STREAM_CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, server, session=None, cache=None, identity_map=True, store=None, history_store=None):
+        """
+        Pass `cache=True` (or a `ResponseCache`) to cache replies to reads.
+        Objects are shared by id via an `IdentityMap` unless `identity_map`
+        is false.  Pass a `MetadataStore` as `store` to serve configuration
+        lookups from a local database, and a `HistoryStore` as
+        `history_store` to keep fetched item history locally.
+        """
         if session is None:
             session = requests.session()
             session.headers['Content-Type'] = 'application/json-rpc'
+        if cache is True:
+            cache = ResponseCache()
+        if identity_map is True:
+            identity_map = IdentityMap()
+        elif identity_map is False:
+            identity_map = None
         self._session = session
         self._endpoint = server + '/api_jsonrpc.php'
         self._id = 0
+        self._id_lock = threading.Lock()
         self._auth = None
+        self._cache = cache
+        self._identity = identity_map
+        self._store = store
+        self._history_store = history_store
+        # The `AsyncApi` wrapping this one, if any.
+        self._async = None
 
 
     def login(self, user, password):
@@ -64,32 +93,174 @@ class Api(object):
         """
         Get "raw" response from zabbix server.
         """
+        if self._cache is not None:
+            reply = self._cache.get(method, params.get('_params', params))
+            if reply is not None:
+                return reply
+        payload = self._payload(method, params)
+        reply = self._check(self._post(payload))
+        if self._cache is not None:
+            self._cache.update(method, payload['params'], reply)
+        return reply
+
+
+    def stream(self, method, **params):
+        """
+        Generate each element of the `result` of a call as it is decoded
+        from the reply, rather than holding the whole reply in memory.
+        """
+        from .jsonstream import iter_result
+        payload = self._payload(method, params)
+        response = self._session.post(self._endpoint, data=codec.dumpb(payload), stream=True)
+        try:
+            for i in iter_result(response.iter_content(self.STREAM_CHUNK_SIZE)):
+                yield i
+        finally:
+            response.close()
+
+
+    def responses(self, calls, size=None):
+        """
+        `[reply]` for each `(method, params)` in `calls`, sent as JSON-RPC
+        batches of at most `size` calls (default `BATCH_SIZE`).  Raises the
+        `ApiException` of the first call that failed.
+        """
+        with self.batch(size) as batch:
+            pending = [batch.call(method, **params) for method, params in calls]
+        return [i.reply for i in pending]
+
+
+    @contextmanager
+    def batch(self, size=None):
+        """
+        Collect calls made via `Batch.call()` and send them as JSON-RPC
+        batches when the block exits:
+
+            with api.batch() as batch:
+                hosts = [batch.call('host.get', filter=dict(name=i)) for i in names]
+            replies = [i.reply for i in hosts]
+        """
+        batch = Batch(self, size or self.BATCH_SIZE)
+        yield batch
+        batch.send()
+
+
+    def save_all(self, objs, size=None):
+        """
+        Publish changes to all `objs`, sending only their changed properties.
+        Objects are grouped by kind into `<api_name>.update` calls of at most
+        `size` objects each (default `BATCH_SIZE`), all sent as JSON-RPC
+        batches.  Returns the number of objects updated.  Objects in calls
+        that fail stay dirty and the first failure's `ApiException` is raised.
+        """
+        size = size or self.BATCH_SIZE
+        by_class = dict()
+        for obj in objs:
+            params = obj._update_params()
+            if params is not None:
+                by_class.setdefault(type(obj), []).append((obj, params))
+        chunks = []
+        with self.batch() as batch:
+            for Class, l in by_class.items():
+                for i in range(0, len(l), size):
+                    chunk = l[i:i + size]
+                    call = batch.call(Class._api_name() + '.update', _params=[p for _, p in chunk])
+                    chunks.append((call, chunk))
+        count = 0
+        error = None
+        for call, chunk in chunks:
+            try:
+                call.reply
+            except ApiException as e:
+                error = error or e
+                continue
+            for obj, _ in chunk:
+                obj._saved()
+            count += len(chunk)
+        if error is not None:
+            raise error
+        return count
+
+
+    def prefetch(self, objs, *relations, **params):
+        """
+        Load each of `relations` (eg `'triggers'`, `'items'`) for all `objs`
+        with one query per relation and kind of object, instead of one per
+        object when their relation properties are first accessed.
+        """
+        by_class = dict()
+        for obj in objs:
+            by_class.setdefault(type(obj), []).append(obj)
+        for Class, l in by_class.items():
+            for relation in relations:
+                Class.prefetch(self, l, relation, **params)
+        return objs
+
+
+    def _get(self, Class, params):
+        """
+        `Class.get` served from the local store when possible.
+        """
+        if self._store is not None:
+            result = self._store.query(self, Class, params)
+            if result is not None:
+                return [Class._from_api(self, i) for i in result]
+        return Class.get(self, **params)
+
+
+    def _resolve(self, Class, names):
+        """
+        `Resolved` map of `names` to `Class` instances using one query for
+        the ids and one for the names among `names`.
+        """
+        names = list(names)
+        queries = _resolve_queries(Class, names)
+        return _resolved(names, queries, [self._get(Class, params) for _, params in queries])
+
+
+    def _payload(self, method, params):
+        """
+        JSON-RPC request for `method` with a fresh id.
+        """
         # Some endpoints like delete accept a simple list for params. Using
         # this kludgy _params hack to avoid changing this method's signature.
         payload = dict(
             jsonrpc = '2.0',
             method = method,
             params = params.get('_params', params),
-            id = self._id,
             auth = self._auth,
         )
-        response = self._session.post(self._endpoint, data=json.dumps(payload))
-        self._id += 1
+        # Calls may come from several threads (eg `Event.iter_sliced`).
+        with self._id_lock:
+            payload['id'] = self._id
+            self._id += 1
+        return payload
+
 
-        if not response.text:
+    def _post(self, payload):
+        """
+        Send `payload` (a request or list of requests) and decode the reply.
+        """
+        response = self._session.post(self._endpoint, data=codec.dumpb(payload))
+        # Decode straight from the bytes to avoid building a str of the reply.
+        content = response.content
+        if not content:
             raise ApiException(ApiException.INVALID_REPLY, 'empty reply', '')
         try:
-            reply = json.loads(response.text)
-            # print("API DEBUG {}:".format(method))
-            # print("REQUEST:\n{}".format(json.dumps(payload, indent=2)))
-            # print("RESPONSE:\n{}".format(json.dumps(reply, indent=2)))
+            reply = codec.loads(content)
         except ValueError:
             raise ApiException(ApiException.INVALID_REPLY, 'invalid json', response.text)
+        return reply
 
+
+    @staticmethod
+    def _check(reply):
+        """
+        Return `reply` unless it carries an error.
+        """
         if 'error' in reply:
             err = reply['error']
             raise ApiException(err['code'], err['message'], err['data'])
-
         return reply
 
 
@@ -97,19 +268,28 @@ class Api(object):
         """
         `Host` by id or name.
         """
-        params = dict()
-        if integerish(name_or_id):
-            params['hostids'] = str(name_or_id)
-        else:
-            params['filter'] = dict(name=name_or_id)
-        return one_only(self.hosts(**params))
+        return one_only(self.hosts(**_lookup_params(objects.Host, name_or_id)))
 
 
     def hosts(self, **params):
         """
         Wrapper around `Host.get`.
         """
-        return objects.Host.get(self, **params)
+        return self._get(objects.Host, params)
+
+
+    def iter_hosts(self, page_size=1000, **params):
+        """
+        Wrapper around `Host.iter`.
+        """
+        return objects.Host.iter(self, page_size, **params)
+
+
+    def hosts_by_name(self, names):
+        """
+        `Resolved` map of each id or name in `names` to its `Host`.
+        """
+        return self._resolve(objects.Host, names)
 
 
     def group_create(self, name):
@@ -120,57 +300,98 @@ class Api(object):
         """
         `Group` by id or name.
         """
-        params = dict()
-        if integerish(name_or_id):
-            params['groupids'] = str(name_or_id)
-        else:
-            params['filter'] = dict(name=name_or_id)
-        return one_only(self.groups(**params))
+        return one_only(self.groups(**_lookup_params(objects.Group, name_or_id)))
 
 
     def groups(self, **params):
         """
         Wrapper around `Group.get`.
         """
-        return objects.Group.get(self, **params)
+        return self._get(objects.Group, params)
+
+
+    def iter_groups(self, page_size=1000, **params):
+        """
+        Wrapper around `Group.iter`.
+        """
+        return objects.Group.iter(self, page_size, **params)
+
+
+    def groups_by_name(self, names):
+        """
+        `Resolved` map of each id or name in `names` to its `Group`.
+        """
+        return self._resolve(objects.Group, names)
 
 
     def template(self, name_or_id):
         """
         `Template` by id or name.
         """
-        params = dict()
-        if integerish(name_or_id):
-            params['templateids'] = str(name_or_id)
-        else:
-            params['filter'] = dict(name=name_or_id)
-        return one_only(self.templates(**params))
+        return one_only(self.templates(**_lookup_params(objects.Template, name_or_id)))
 
 
     def templates(self, **params):
         """
         Wrapper around `Template.get`.
         """
-        return objects.Template.get(self, **params)
+        return self._get(objects.Template, params)
+
+
+    def iter_templates(self, page_size=1000, **params):
+        """
+        Wrapper around `Template.iter`.
+        """
+        return objects.Template.iter(self, page_size, **params)
+
+
+    def templates_by_name(self, names):
+        """
+        `Resolved` map of each id or name in `names` to its `Template`.
+        """
+        return self._resolve(objects.Template, names)
 
 
     def item(self, name_or_id):
         """
         `Item` by id or name.
         """
-        params = dict()
-        if integerish(name_or_id):
-            params['itemids'] = str(name_or_id)
-        else:
-            params['filter'] = dict(name=name_or_id)
-        return one_only(self.items(**params))
+        return one_only(self.items(**_lookup_params(objects.Item, name_or_id)))
 
 
     def items(self, **params):
         """
         Wrapper around `Item.get`.
         """
-        return objects.Item.get(self, **params)
+        return self._get(objects.Item, params)
+
+
+    def iter_items(self, page_size=1000, **params):
+        """
+        Wrapper around `Item.iter`.
+        """
+        return objects.Item.iter(self, page_size, **params)
+
+
+    def items_by_name(self, names):
+        """
+        `Resolved` map of each id or name in `names` to its `Item`.
+        """
+        return self._resolve(objects.Item, names)
+
+
+    def history(self, items, ts_from=None, ts_to=None, as_frame=False, page_size=None, workers=4):
+        """
+        Wrapper around `timeseries.fetch`, or `timeseries.fetch_frame` with
+        `as_frame`.  Served via the `history_store` if there is one.
+        """
+        # Import here so numpy is only needed when history is.
+        from . import timeseries
+        if self._history_store is not None:
+            histories = self._history_store.fetch(self, items, ts_from, ts_to, page_size, workers)
+            return timeseries.to_frame(histories) if as_frame else histories
+        fetch = timeseries.fetch_frame if as_frame else timeseries.fetch
+        return fetch(self, items, ts_from, ts_to, page_size, workers)
 
 
     def trigger(self, id):
@@ -187,16 +408,18 @@ class Api(object):
         return objects.Trigger.get(self, **params)
 
 
+    def iter_triggers(self, page_size=1000, **params):
+        """
+        Wrapper around `Trigger.iter`.
+        """
+        return objects.Trigger.iter(self, page_size, **params)
+
+
     def application(self, name_or_id):
         """
         `Application` by id or name.
         """
-        params = dict()
-        if integerish(name_or_id):
-            params['applicationids'] = str(name_or_id)
-        else:
-            params['filter'] = dict(name=name_or_id)
-        return one_only(self.applications(**params))
+        return one_only(self.applications(**_lookup_params(objects.Application, name_or_id)))
 
 
     def applications(self, **params):
@@ -213,18 +436,168 @@ class Api(object):
         return one_only(self.events(eventids=id))
 
 
-    def events(self, **params):
+    def events(self, slice=None, workers=4, **params):
         """
-        Wrapper around `Event.get`.
+        Wrapper around `Event.get`, or `Event.iter_sliced` given a `slice`.
         """
+        if slice is not None:
+            return objects.Event.iter_sliced(self, slice, workers, **params)
         return objects.Event.get(self, **params)
 
 
-    def problems(self, **params):
+    def iter_events(self, page_size=1000, **params):
+        """
+        Wrapper around `Event.iter`.
+        """
+        return objects.Event.iter(self, page_size, **params)
+
+
+    def problems(self, with_events=False, with_triggers=False, **params):
+        """
+        Wrapper around `Problem.get`, optionally loading the `event` and/or
+        `trigger` of every problem in bulk (see `Problem.load_related`).
         """
-        Wrapper around `Problem.get`.
+        problems = objects.Problem.get(self, **params)
+        if with_events or with_triggers:
+            objects.Problem.load_related(self, problems, with_events, with_triggers)
+        return problems
+
+
+    def iter_problems(self, page_size=1000, **params):
+        """
+        Wrapper around `Problem.iter`.
+        """
+        return objects.Problem.iter(self, page_size, **params)
+
+
+class Batch(object):
+    """
+    Calls queued by `Api.batch()` to be sent as JSON-RPC batch requests.
+    """
+
+    def __init__(self, api, size):
+        self._api = api
+        self._size = size
+        self._calls = []
+
+
+    def call(self, method, **params):
         """
-        return objects.Problem.get(self, **params)
+        Queue a call, returning a `BatchCall` that holds its reply once sent.
+        """
+        call = BatchCall(self._api._payload(method, params))
+        self._calls.append(call)
+        return call
+
+
+    def send(self):
+        """
+        Send all queued calls, `size` at a time.
+        """
+        calls, self._calls = self._calls, []
+        for i in range(0, len(calls), self._size):
+            chunk = calls[i:i + self._size]
+            replies = self._api._post([c.payload for c in chunk])
+            if not isinstance(replies, list):
+                # Zabbix replies with a single error when the batch itself is bad.
+                self._api._check(replies)
+                raise ApiException(ApiException.INVALID_REPLY, 'expected batch reply', replies)
+            by_id = dict((r.get('id'), r) for r in replies)
+            for call in chunk:
+                call._reply = by_id.get(call.payload['id'])
+                if self._api._cache is not None and call._reply and 'error' not in call._reply:
+                    self._api._cache.update(call.payload['method'], call.payload['params'], call._reply)
+
+
+class BatchCall(object):
+    """
+    A single call within a `Batch`.
+    """
+
+    def __init__(self, payload):
+        self.payload = payload
+        self._reply = None
+
+
+    @property
+    def reply(self):
+        """
+        "Raw" response for this call, raising `ApiException` if it failed.
+        """
+        if self._reply is None:
+            raise ApiException(ApiException.INVALID_REPLY, 'no reply', self.payload['id'])
+        return Api._check(self._reply)
+
+
+    @property
+    def result(self):
+        """
+        The `result` field of this call's reply.
+        """
+        return self.reply.get('result')
+
+
+class Resolved(dict):
+    """
+    Map of requested names (or ids) to the single `ApiObject` each matched.
+    Names with no match are listed in `missing` and those that matched more
+    than one object are mapped to all their matches in `ambiguous`.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.missing = []
+        self.ambiguous = dict()
+
+
+def _lookup_params(Class, name_or_id):
+    """
+    `Class.get` params for one object by id or name.
+    """
+    params = dict()
+    if integerish(name_or_id):
+        params[Class._id_field(plural=True)] = str(name_or_id)
+    else:
+        params['filter'] = {Class._text_field(): name_or_id}
+    return params
+
+
+def _resolve_queries(Class, names):
+    """
+    `[(field, params)]` of the `Class.get` calls resolving `names`: one for
+    the ids, with a None field, and one for the rest by `Class._text_field`.
+    """
+    ids = [str(i) for i in names if integerish(i)]
+    texts = [i for i in names if not integerish(i)]
+    queries = []
+    if ids:
+        params = dict()
+        params[Class._id_field(plural=True)] = ids
+        queries.append((None, params))
+    if texts:
+        queries.append((Class._text_field(), dict(filter={Class._text_field(): texts})))
+    return queries
+
+
+def _resolved(names, queries, results):
+    """
+    `Resolved` map of `names` from the `results` of their `queries`.
+    """
+    found = dict()
+    for (field, _), objs in zip(queries, results):
+        for obj in objs:
+            key = str(obj.id) if field is None else obj._props[field].val
+            found.setdefault(key, []).append(obj)
+    resolved = Resolved()
+    for name in names:
+        matches = found.get(str(name), [])
+        if len(matches) == 1:
+            resolved[name] = matches[0]
+        elif len(matches) == 0:
+            resolved.missing.append(name)
+        else:
+            resolved.ambiguous[name] = matches
+    return resolved
 
 
 def integerish(val):
@@ -0,0 +1,125 @@
+"""
+Caching of replies to read-only api calls.
+"""
+
+import json
+import time
+import threading
+from collections import OrderedDict
+
+__all__ = [
+    'ResponseCache',
+]
+
+
+class ResponseCache(object):
+    """
+    LRU cache of replies to `*.get` calls, keyed on method and params, for use
+    with `Api(server, cache=ResponseCache())`.  Entries expire after `ttl`
+    seconds, or the per-method TTL in `ttls` (0 disables caching a method).
+    Writes such as `host.update` drop cached replies for their object type
+    and the types whose replies may embed it.
+    """
+
+    # Reads of live state (samples, last values, trigger & problem state)
+    # aren't cached by default.
+    DEFAULT_TTLS = {
+        'hostgroup.get': 300,
+        'template.get': 300,
+        'event.get': 0,
+        'problem.get': 0,
+        'history.get': 0,
+        'trend.get': 0,
+        'item.get': 0,
+        'trigger.get': 0,
+    }
+
+    WRITES = ('create', 'update', 'delete', 'massadd', 'massremove', 'massupdate')
+
+    # Object types whose replies may embed objects of a given type.
+    RELATED = dict(
+        host = ('hostgroup', 'template', 'item', 'trigger', 'application', 'maintenance', 'event'),
+        hostgroup = ('host', 'template', 'trigger', 'maintenance'),
+        template = ('host', 'hostgroup', 'item', 'trigger'),
+        item = ('host', 'template', 'trigger', 'application'),
+        trigger = ('host', 'template', 'item', 'event', 'problem'),
+        application = ('host', 'template', 'item'),
+        maintenance = ('host', 'hostgroup'),
+    )
+
+    def __init__(self, maxsize=1000, ttl=60, ttls=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.ttls = dict(self.DEFAULT_TTLS)
+        self.ttls.update(ttls or {})
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+
+    def get(self, method, params):
+        """
+        Cached reply for `method` & `params`, or None.
+        """
+        if not self._cacheable(method):
+            return None
+        key = self._key(method, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.time():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+
+    def update(self, method, params, reply):
+        """
+        Record a successful `reply`: cache it for reads, invalidate for writes.
+        """
+        kind, _, verb = method.partition('.')
+        if verb in self.WRITES:
+            self.invalidate(kind, *self.RELATED.get(kind, ()))
+        elif self._cacheable(method):
+            key = self._key(method, params)
+            expires = time.time() + self.ttls.get(method, self.ttl)
+            with self._lock:
+                self._entries[key] = (expires, reply)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+
+
+    def invalidate(self, *kinds):
+        """
+        Drop cached replies for the given object types, eg `'host'`.
+        """
+        prefixes = tuple(i + '.' for i in kinds)
+        with self._lock:
+            for key in [i for i in self._entries if i.startswith(prefixes)]:
+                del self._entries[key]
+
+
+    def clear(self):
+        """
+        Drop all cached replies.
+        """
+        with self._lock:
+            self._entries.clear()
+
+
+    def __len__(self):
+        return len(self._entries)
+
+
+    def _cacheable(self, method):
+        return method.endswith('.get') and self.ttls.get(method, self.ttl) > 0
+
+
+    @staticmethod
+    def _key(method, params):
+        return method + ' ' + json.dumps(params, sort_keys=True, default=str)
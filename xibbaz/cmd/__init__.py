@@ -4,3 +4,17 @@ Namespace for command-line wrappers.
 import sys
 from docopt import docopt
 from xibbaz import login, objects
+
+
+def resolve_hosts(api, names):
+    """
+    `[Host]` for each of `names`, exiting if any are missing or ambiguous.
+    """
+    hosts = api.hosts_by_name(names)
+    for name in hosts.missing:
+        print('unknown host:', name, file=sys.stderr)
+    for name in hosts.ambiguous:
+        print('ambiguous host:', name, file=sys.stderr)
+    if hosts.missing or hosts.ambiguous:
+        sys.exit(1)
+    return [hosts[i] for i in names]
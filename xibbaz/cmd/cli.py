@@ -6,7 +6,8 @@ Usage: COMMAND [options] <entity> <method> <params>...
 Arguments:
   - entity: the kind of object to query (host, group, template)
   - method: the api call/method/verb (eg get, update, massadd) - not all supported
-  - params: the arguments to pass to entity's `get` api call.
+  - params: the arguments to pass to entity's `get` api call.  Use
+    `fields:a,b` or `profile:light` to fetch only some properties.
 
 Options:
   -d, --debug
@@ -20,7 +21,7 @@ Refer to zabbix api documentation for details:
   - https://www.zabbix.com/documentation/3.4/manual/api
 """
 from . import *
-import json
+from xibbaz import codec
 
 
 def main(argv):
@@ -48,6 +49,8 @@ def main(argv):
         params['search'] = dict(i.split(':', 1) for i in params['search'].split('+'))
         for name, val in params['search'].items():
             params['search'][name] = val.split(',')
+    if 'fields' in params:
+        params['fields'] = params['fields'].split(',')
     for name, val in params.items():
         if isinstance(val, str) and val.lower() in ['true', 'True', 'yes', 'Yes']:
             params[name] = True
@@ -59,8 +62,7 @@ def main(argv):
         params['startSearch'] = True
     if debug:
         print('DEBUG params:')
-        json.dump(params, sys.stdout, indent=2)
-        print('')
+        print(codec.dumps(params, indent=2))
 
     Entity = getattr(objects, entity, None)
     if not Entity:
@@ -73,7 +75,7 @@ def main(argv):
     result = method(api, **params)
     if jq:
         result = jq.first([i.json() for i in result])
-    json.dump(result, sys.stdout, indent=2, default=lambda i: i.json())
+    sys.stdout.write(codec.dumps(result, indent=2, default=lambda i: i.json()))
 
 
 if __name__ == '__main__':
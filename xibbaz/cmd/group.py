@@ -23,7 +23,7 @@ def main(argv):
 
     api = login(opts.get('--api'))
     group = api.group(opts.get('<group>'))
-    hosts = map(api.host, opts.get('<hosts>'))
+    hosts = resolve_hosts(api, opts.get('<hosts>'))
     if verb == 'remove':
         group.remove_hosts(*hosts)
     else:
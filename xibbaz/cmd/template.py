@@ -22,7 +22,7 @@ def main(argv):
 
     api = login(opts.get('--api'))
     template = api.template(opts.get('<template>'))
-    hosts = map(api.host, opts.get('<hosts>'))
+    hosts = resolve_hosts(api, opts.get('<hosts>'))
     if verb == 'remove':
         template.remove_hosts(*hosts)
     else:
@@ -46,7 +46,14 @@ def main(argv):
         sys.exit(1)
 
     api = login(opts.get('--api'))
-    params = dict()
+    # Everything needed for the report in a single request.
+    params = dict(
+        fields = ['description', 'priority', 'value'],
+        selects = dict(Hosts=['hostid', 'host', 'name']),
+        expandDescription = 1,
+    )
+    if min_priority > 0:
+        params['min_severity'] = min_priority
     if hostname:
         host = api.host(hostname)
         params['hostids'] = [host.id]
@@ -56,12 +63,11 @@ def main(argv):
         params['monitored'] = 1
     status = 0
     for t in sorted(api.triggers(**params), key = lambda i: (i.value.val, i.priority.val), reverse=True):
-        if t.priority.val >= min_priority:
-            problematic = t.value.val > 0
-            if problematic:
-                status += 1
-            if verbose or problematic:
-                print("{:8}  {:12}  {:25}  {}".format(t.value, t.priority, t.hosts[0], description(t)))
+        problematic = t.value.val > 0
+        if problematic:
+            status += 1
+        if verbose or problematic:
+            print("{:8}  {:12}  {:25}  {}".format(t.value, t.priority, t.hosts[0], description(t)))
     sys.exit(status)
 
 
@@ -0,0 +1,66 @@
+"""
+JSON encoding & decoding using the fastest library available: `orjson`, then
+`ujson`, falling back to the standard library.
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+__all__ = [
+    'dumpb',
+    'dumps',
+    'loads',
+    'NAME',
+]
+
+if orjson is not None:
+    NAME = 'orjson'
+elif ujson is not None:
+    NAME = 'ujson'
+else:
+    NAME = 'json'
+
+
+def loads(data):
+    """
+    Decode JSON from `data`, preferably bytes so no str copy is needed.
+    Raises `ValueError` for invalid JSON.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    if ujson is not None:
+        return ujson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj, indent=None, default=None):
+    """
+    Encode `obj` as a JSON str, calling `default` for objects that aren't
+    otherwise serializable.
+    """
+    if orjson is not None and indent in (None, 2):
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=default, option=option).decode('utf-8')
+    if ujson is not None and default is None:
+        return ujson.dumps(obj, indent=indent or 0, ensure_ascii=False)
+    return json.dumps(obj, indent=indent, default=default, ensure_ascii=False)
+
+
+def dumpb(obj):
+    """
+    Encode `obj` as compact JSON bytes, eg for a request body.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return dumps(obj).encode('utf-8')
@@ -0,0 +1,307 @@
+"""
+Persistent local cache of item history.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy
+from . import codec
+from .objects import Item
+from .objects.api import _epoch
+from .timeseries import History, VALUE_DTYPES, _bounds, _decode_pages, fetch
+
+__all__ = [
+    'HistoryStore',
+]
+
+
+class HistoryStore(object):
+    """
+    Memory-mapped copy of numeric item history for use with
+    `Api(server, history_store=HistoryStore(path))`, so re-running a report
+    or notebook only downloads samples newer than those already stored.
+
+    Items of each `value_type` share one data file under `path`, holding a
+    contiguous extent per item of clock, ns & value columns with room to
+    grow, plus a json index of each item's extent and the range it covers.
+    `Item.history_array` and `Api.history` then ask `history.get` only for
+    `time_from > last` and return `History` arrays that are views onto the
+    data files, with one memory map (and file descriptor) per file however
+    many items are viewed.  Asking for samples older than those stored
+    refetches the item from scratch.  Samples that reach the server after
+    their range was fetched are not picked up.  Non-numeric items aren't
+    stored.
+
+    Data files only grow: samples are written past the ones in use before
+    the index is replaced to include them, so earlier views never change
+    and an interrupted save just leaves unused space.  Extents outgrown or
+    replaced by refetches are reclaimed by `compact`.
+    """
+
+    # Column names & dtypes of each extent; values use the item's dtype.
+    COLUMNS = (('clock', numpy.int64), ('ns', numpy.int64), ('value', None))
+
+    # Samples an item's extent has room for when first written.
+    MIN_CAPACITY = 256
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._lock = threading.RLock()
+        self._indexes = dict()
+        self._maps = dict()
+
+
+    def fetch(self, api, items, ts_from=None, ts_to=None, page_size=None, workers=4):
+        """
+        `{itemid: History}` like `timeseries.fetch`, fetching only what the
+        store is missing.  Items with the same `value_type` share queries.
+        """
+        start, end = _epoch(ts_from), _epoch(ts_to)
+        stored = [i for i in items if i.value_type.val in VALUE_DTYPES]
+        others = [i for i in items if i.value_type.val not in VALUE_DTYPES]
+        histories = fetch(api, others, ts_from, ts_to, page_size, workers) if others else dict()
+
+        # Group items by what needs fetching: (value_type, since) for those
+        # to refetch from scratch, (value_type, None) for those to append to.
+        groups = dict()
+        for item in stored:
+            value_type = item.value_type.val
+            meta = self._meta(value_type, item.id)
+            if meta is None or not _covers_start(meta, start):
+                groups.setdefault((value_type, 'full', start), []).append(item)
+            elif end is None or end > meta['last']:
+                groups.setdefault((value_type, 'append', None), []).append(item)
+
+        def load(key):
+            value_type, mode, since = key
+            metas = dict((int(i.id), self._meta(value_type, i.id)) for i in groups[key])
+            if mode == 'append':
+                since = min(i['last'] for i in metas.values()) + 1
+            until = int(time.time()) if end is None else min(end, int(time.time()))
+            itemids = [i.id for i in groups[key]]
+            pages = Item._history_pages(api, itemids, value_type, since, end, page_size)
+            cols = _decode_pages(pages, value_type)
+            bounds = _bounds(cols)
+            for id, meta in metas.items():
+                lo, hi = bounds.get(id, (0, 0))
+                part = dict((k, None if v is None else v[lo:hi]) for k, v in cols.items())
+                # Samples past `until` (eg from a server clock running ahead)
+                # are left for the next top-up, which starts after `until`.
+                keep = part['clock'] <= until
+                if mode == 'append':
+                    keep &= part['clock'] > meta['last']
+                part = dict((k, None if v is None else v[keep]) for k, v in part.items())
+                if mode == 'append':
+                    self._append(value_type, id, part, until)
+                else:
+                    self._write(value_type, id, part, start, until)
+
+        if groups:
+            with ThreadPoolExecutor(min(workers, len(groups))) as pool:
+                list(pool.map(load, sorted(groups, key=str)))
+        for item in stored:
+            histories[int(item.id)] = self._view(item.value_type.val, item.id, start, end)
+        return histories
+
+
+    def clear(self):
+        """
+        Drop all stored history.
+        """
+        with self._lock:
+            for name in os.listdir(self.path):
+                os.remove(os.path.join(self.path, name))
+            self._indexes.clear()
+            self._maps.clear()
+
+
+    def compact(self):
+        """
+        Rewrite each data file with just the samples in use, reclaiming the
+        space of outgrown & replaced extents.  Earlier views keep the old
+        file.
+        """
+        with self._lock:
+            for value_type in VALUE_DTYPES:
+                index = self._index(value_type)
+                if not index['items']:
+                    continue
+                old = self._map(value_type)
+                items = dict()
+                data = '{}.{}.dat'.format(value_type, index['generation'] + 1)
+                with open(os.path.join(self.path, data), 'wb') as f:
+                    size = 0
+                    for id, meta in sorted(index['items'].items()):
+                        cols = self._extent(old, value_type, meta)
+                        meta = dict(meta, offset=size, capacity=max(meta['rows'], 1))
+                        size = self._put(f, value_type, meta, 0, cols)
+                        items[id] = meta
+                    f.truncate(size)
+                previous = index['data']
+                self._save_index(value_type, dict(
+                    index, items=items, size=size, data=data, generation=index['generation'] + 1,
+                ))
+                os.remove(os.path.join(self.path, previous))
+
+
+    def _meta(self, value_type, itemid):
+        """
+        `{offset, capacity, rows, first, last}` of the extent & range stored
+        for `itemid`, or None.
+        """
+        with self._lock:
+            return self._index(value_type)['items'].get(str(int(itemid)))
+
+
+    def _index(self, value_type):
+        """
+        Index of the items stored for `value_type`, loaded on first use.
+        """
+        index = self._indexes.get(value_type)
+        if index is None:
+            try:
+                with open(self._index_file(value_type), 'rb') as f:
+                    index = codec.loads(f.read())
+            except FileNotFoundError:
+                index = dict(items=dict(), size=0, data='{}.0.dat'.format(value_type), generation=0)
+            self._indexes[value_type] = index
+        return index
+
+
+    def _index_file(self, value_type):
+        return os.path.join(self.path, '{}.json'.format(value_type))
+
+
+    def _data_file(self, value_type):
+        return os.path.join(self.path, self._index(value_type)['data'])
+
+
+    def _save_index(self, value_type, index):
+        """
+        Replace the index of `value_type` in one step, so samples written
+        since the last save are either all in use or all ignored.
+        """
+        path = self._index_file(value_type)
+        with open(path + '.tmp', 'w') as f:
+            f.write(codec.dumps(index))
+        os.replace(path + '.tmp', path)
+        self._indexes[value_type] = index
+
+
+    def _columns(self, value_type):
+        return [(name, dtype or VALUE_DTYPES[value_type]) for name, dtype in self.COLUMNS]
+
+
+    def _write(self, value_type, itemid, cols, first, last):
+        """
+        Replace the stored history of `itemid` with a new extent.
+        """
+        with self._lock:
+            index = self._index(value_type)
+            rows = len(cols['clock'])
+            meta = dict(offset=index['size'], capacity=max(rows, self.MIN_CAPACITY), rows=rows, first=first, last=last)
+            with self._open(value_type) as f:
+                size = self._put(f, value_type, meta, 0, cols)
+            items = dict(index['items'])
+            items[str(int(itemid))] = meta
+            self._save_index(value_type, dict(index, items=items, size=size))
+
+
+    def _append(self, value_type, itemid, cols, last):
+        """
+        Add newer samples to the stored history of `itemid`, in place if
+        its extent has room and otherwise by moving it to one twice as big.
+        """
+        with self._lock:
+            index = self._index(value_type)
+            meta = dict(index['items'][str(int(itemid))], last=last)
+            size = index['size']
+            new = len(cols['clock'])
+            with self._open(value_type) as f:
+                if meta['rows'] + new > meta['capacity']:
+                    old = self._extent(self._map(value_type), value_type, meta)
+                    meta.update(offset=size, capacity=max(2 * meta['capacity'], meta['rows'] + new))
+                    size = self._put(f, value_type, meta, 0, old)
+                self._put(f, value_type, meta, meta['rows'], cols)
+            meta['rows'] += new
+            items = dict(index['items'])
+            items[str(int(itemid))] = meta
+            self._save_index(value_type, dict(index, items=items, size=size))
+
+
+    def _open(self, value_type):
+        path = self._data_file(value_type)
+        return open(path, 'r+b' if os.path.exists(path) else 'w+b')
+
+
+    def _put(self, f, value_type, meta, row, cols):
+        """
+        Write `cols` into the extent of `meta` from `row` on, and return
+        the offset just past the extent.
+        """
+        pos = meta['offset']
+        for name, dtype in self._columns(value_type):
+            col = cols[name]
+            if col is None:
+                col = numpy.zeros(len(cols['clock']), dtype)
+            f.seek(pos + row * numpy.dtype(dtype).itemsize)
+            f.write(numpy.ascontiguousarray(col, dtype).tobytes())
+            pos += meta['capacity'] * numpy.dtype(dtype).itemsize
+        # Grow the file ahead of need so its memory map is rarely replaced.
+        length = f.seek(0, os.SEEK_END)
+        if length < pos:
+            f.truncate(max(pos, 2 * length))
+        return pos
+
+
+    def _map(self, value_type):
+        """
+        Memory map of the data file of `value_type` covering every extent
+        in use, reused until the file outgrows it.
+        """
+        index = self._index(value_type)
+        mm = self._maps.get(value_type)
+        if mm is None or mm.filename != os.path.abspath(self._data_file(value_type)) or len(mm) < index['size']:
+            if not index['size']:
+                return numpy.empty(0, numpy.uint8)
+            mm = numpy.memmap(self._data_file(value_type), dtype=numpy.uint8, mode='r')
+            self._maps[value_type] = mm
+        return mm
+
+
+    def _extent(self, mm, value_type, meta):
+        """
+        `{column: array}` of the samples in use in the extent of `meta`.
+        """
+        cols = dict()
+        pos = meta['offset']
+        for name, dtype in self._columns(value_type):
+            size = numpy.dtype(dtype).itemsize
+            cols[name] = mm[pos:pos + meta['rows'] * size].view(dtype)
+            pos += meta['capacity'] * size
+        return cols
+
+
+    def _view(self, value_type, itemid, start, end):
+        """
+        `History` of `itemid` from `start` until `end`, as views onto the
+        stored data file.
+        """
+        with self._lock:
+            meta = self._meta(value_type, itemid)
+            cols = self._extent(self._map(value_type), value_type, meta)
+        clock = cols['clock']
+        lo = 0 if start is None else clock.searchsorted(start, 'left')
+        hi = len(clock) if end is None else clock.searchsorted(end, 'right')
+        return History._from_cols(cols, lo, hi)
+
+def _covers_start(meta, start):
+    """
+    Whether the stored range begins no later than `start`.
+    """
+    if meta['first'] is None:
+        return True
+    return start is not None and start >= meta['first']
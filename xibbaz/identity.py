@@ -0,0 +1,69 @@
+"""
+Identity map so each Zabbix object is represented by one `ApiObject`.
+"""
+
+import threading
+import weakref
+from collections import OrderedDict
+
+__all__ = [
+    'IdentityMap',
+]
+
+
+class IdentityMap(object):
+    """
+    Weak-valued map of `(class, id)` to the `ApiObject` for it, for use with
+    `Api(server, identity_map=IdentityMap())`.  Objects live only as long as
+    something else refers to them, except for the `pin` most recently seen
+    which are kept alive so repeated lookups keep hitting.
+    """
+
+    def __init__(self, pin=0):
+        self.pin = pin
+        self._objects = weakref.WeakValueDictionary()
+        self._pinned = OrderedDict()
+        self._lock = threading.Lock()
+
+
+    def get(self, Class, id):
+        """
+        The known `Class` instance with `id`, or None.
+        """
+        key = (Class, str(id))
+        with self._lock:
+            obj = self._objects.get(key)
+            if obj is not None:
+                self._touch(key, obj)
+            return obj
+
+
+    def add(self, obj):
+        """
+        Remember `obj` as the instance for its class & id.
+        """
+        key = (type(obj), str(obj.id))
+        with self._lock:
+            self._objects[key] = obj
+            self._touch(key, obj)
+
+
+    def clear(self):
+        """
+        Forget all objects.
+        """
+        with self._lock:
+            self._objects.clear()
+            self._pinned.clear()
+
+
+    def __len__(self):
+        return len(self._objects)
+
+
+    def _touch(self, key, obj):
+        if self.pin:
+            self._pinned[key] = obj
+            self._pinned.move_to_end(key)
+            while len(self._pinned) > self.pin:
+                self._pinned.popitem(last=False)
@@ -0,0 +1,126 @@
+"""
+Incremental decoding of JSON-RPC replies.
+
+Large `*.get` replies are decoded one element of `result` at a time as the
+body is read, so only the element being parsed and the read buffer are held
+in memory rather than the whole reply as bytes, text and objects at once.
+"""
+
+import codecs
+import json
+from .api import ApiException
+
+__all__ = [
+    'iter_result',
+]
+
+_decoder = json.JSONDecoder()
+
+_WHITESPACE = ' \t\r\n'
+
+
+def iter_result(chunks):
+    """
+    Generate each element of the `result` array of a JSON-RPC reply read
+    from the byte strings in `chunks`.  A non-array `result` is generated
+    as a single value.  Raises `ApiException` for an error reply.
+    """
+    reader = _Reader(chunks)
+    reader.expect('{')
+    if reader.peek() == '}':
+        raise ApiException(ApiException.INVALID_REPLY, 'no result', '{}')
+    while True:
+        key = reader.value()
+        reader.expect(':')
+        if key == 'result' and reader.peek() == '[':
+            reader.pos += 1
+            if reader.peek() == ']':
+                reader.pos += 1
+            else:
+                while True:
+                    yield reader.value()
+                    if reader.expect(',]') == ']':
+                        break
+        elif key == 'result':
+            yield reader.value()
+        elif key == 'error':
+            err = reader.value()
+            raise ApiException(err['code'], err['message'], err['data'])
+        else:
+            reader.value()
+        if reader.expect(',}') == '}':
+            return
+
+
+class _Reader(object):
+    """
+    Buffered text over a stream of utf-8 encoded byte chunks.
+    """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+
+    def fill(self):
+        """
+        Append the next chunk to the buffer, dropping what's been consumed.
+        Return false once there is nothing left to read.
+        """
+        if self.eof:
+            return False
+        self.buf = self.buf[self.pos:]
+        self.pos = 0
+        try:
+            chunk = next(self._chunks)
+        except StopIteration:
+            self.eof = True
+            self.buf += self._utf8.decode(b'', final=True)
+            return False
+        self.buf += self._utf8.decode(chunk)
+        return True
+
+
+    def peek(self):
+        """
+        Next non-whitespace character, or '' at the end of the stream.
+        """
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ''
+
+
+    def expect(self, chars):
+        """
+        Consume and return the next character, which must be one of `chars`.
+        """
+        c = self.peek()
+        if not c or c not in chars:
+            raise ApiException(ApiException.INVALID_REPLY, 'invalid json', self.buf[self.pos:self.pos + 80])
+        self.pos += 1
+        return c
+
+
+    def value(self):
+        """
+        Consume and return the next JSON value.
+        """
+        self.peek()
+        while True:
+            try:
+                val, end = _decoder.raw_decode(self.buf, self.pos)
+                # A number at the end of the buffer may continue in the next chunk.
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return val
+            except ValueError:
+                if self.eof:
+                    raise ApiException(ApiException.INVALID_REPLY, 'invalid json', self.buf[self.pos:self.pos + 80])
+            self.fill()
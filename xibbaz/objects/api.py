@@ -2,16 +2,32 @@
 Implementation of Zabbix API objects.
 """
 
-import json
-from datetime import datetime
+import calendar
+import re
+from collections.abc import Mapping
+from datetime import datetime, timedelta
+from .. import codec
 
 
 class MetaApiObject(type):
     """
     Metaclass for ApiObject provides:
       - dynamic doc string based on ApiObject.PROPS
+      - `PROPS` compiled once per class into `_SPECS` of `PropertySpec`
+      - an attribute per property, eg `host.name`, unless the class already
+        has an attribute by that name
     """
 
+    def __init__(Class, name, bases, ns):
+        super().__init__(name, bases, ns)
+        Class._SPECS = dict(
+            (name, PropertySpec(name, **spec))
+            for name, spec in getattr(Class, 'PROPS', {}).items()
+        )
+        for name in Class._SPECS:
+            if not hasattr(Class, name):
+                setattr(Class, name, PropertyAttribute(name))
+
     @property
     def __doc__(self):
         l = ['API Properties:']
@@ -27,6 +43,16 @@ class ApiObject(object, metaclass=MetaApiObject):
 
     DEFAULT_SELECTS = ()
 
+    # Name of the `*.get` param selecting ids from a given id onward, if any.
+    ID_FROM = None
+
+    # Named projections for `get(profile=...)`: the fields to output and the
+    # relations to select.  The id field is always included.
+    PROFILES = dict(
+        light = dict(fields=(), selects=()),
+        full = None,
+    )
+
     @classmethod
     def _zabbix_name(Class):
         """
@@ -76,15 +102,256 @@ class ApiObject(object, metaclass=MetaApiObject):
 
 
     @classmethod
-    def get(Class, api, **params):
+    def get(Class, api, stream=False, fields=None, selects=None, profile=None, prefetch=(), as_frame=False, **params):
         """
-        `[ApiObject]` that match criteria in `params`.
+        `[ApiObject]` that match criteria in `params`.  With `stream`, a
+        generator of them decoded one at a time as the reply is read.
+
+        Only the properties in `fields` and the relations in `selects` are
+        fetched when either is given, eg:
+
+            Item.get(api, fields=['key_', 'lastvalue'], selects={'Hosts': ['name']})
+
+        `profile` names one of `PROFILES` instead, eg `'light'`.  Otherwise
+        all properties & `DEFAULT_SELECTS` are fetched.
+
+        Relations named in `prefetch` are loaded for all the objects with one
+        query per relation (see `prefetch`); not supported with `stream`.
+
+        With `as_frame`, a columnar `ResultSet` (see `ResultSet.to_frame`) is
+        built from the reply instead of objects.
         """
-        for name in ['select' + i for i in Class.DEFAULT_SELECTS]:
-            if name not in params:
-                params[name] = 'extend'
+        params = Class._get_params(params, fields, selects, profile)
+        if as_frame:
+            from ..resultset import ResultSet
+            if stream:
+                return ResultSet(Class, api.stream(Class._api_name() + '.get', **params))
+            return ResultSet(Class, api.response(Class._api_name() + '.get', **params).get('result'))
+        if stream:
+            return (Class._from_api(api, i) for i in api.stream(Class._api_name() + '.get', **params))
         result = api.response(Class._api_name() + '.get', **params).get('result')
-        return [Class(api, **i) for i in result]
+        objs = [Class._from_api(api, i) for i in result]
+        for relation in prefetch:
+            Class.prefetch(api, objs, relation)
+        return objs
+
+
+    @classmethod
+    def iter(Class, api, page_size=1000, **params):
+        """
+        Generate `ApiObject`s that match criteria in `params` in id order,
+        fetching at most `page_size` at a time.  `stream` & `as_frame` aren't
+        supported since paging needs the objects of each page.
+        """
+        for name in ('stream', 'as_frame'):
+            if params.pop(name, False):
+                # Import here to avoid circular imports.
+                from ..api import ApiException
+                raise ApiException(ApiException.INVALID_VALUE, 'not supported by iter', name)
+        id_field = Class._id_field()
+        params.pop('limit', None)
+        if Class.ID_FROM:
+            params['sortfield'] = id_field
+            params['sortorder'] = 'ASC'
+            params['limit'] = page_size
+            while True:
+                objs = Class.get(api, **dict(params))
+                for obj in objs:
+                    yield obj
+                if len(objs) < page_size:
+                    return
+                params[Class.ID_FROM] = int(objs[-1].id) + 1
+        else:
+            # The api has no way to continue from the last id seen, so list
+            # the matching ids cheaply and then fetch them a page at a time.
+            id_params = dict((k, v) for k, v in params.items()
+                             if not k.startswith('select') and k not in ('fields', 'profile', 'prefetch'))
+            id_params['output'] = [id_field]
+            result = api.response(Class._api_name() + '.get', **id_params).get('result')
+            ids = sorted(int(i[id_field]) for i in result)
+            params['sortfield'] = id_field
+            for i in range(0, len(ids), page_size):
+                params[Class._id_field(plural=True)] = ids[i:i + page_size]
+                for obj in Class.get(api, **dict(params)):
+                    yield obj
+
+
+    @classmethod
+    async def aget(Class, api, fields=None, selects=None, profile=None, **params):
+        """
+        Awaitable `get` for use with an `AsyncApi`.  The objects carry its
+        `sync` api.
+        """
+        params = Class._get_params(params, fields, selects, profile)
+        reply = await api.response(Class._api_name() + '.get', **params)
+        return [Class._from_api(api.sync, i) for i in reply.get('result')]
+
+
+    @classmethod
+    def _get_params(Class, params, fields=None, selects=None, profile=None):
+        """
+        `params` for a `*.get` call, with `output` and `select*` filled in
+        from the projection given by `fields`, `selects` or `profile`, or
+        with `DEFAULT_SELECTS` when there is none.
+        """
+        if profile is not None:
+            if profile not in Class.PROFILES:
+                # Import here to avoid circular imports.
+                from ..api import ApiException
+                raise ApiException(ApiException.INVALID_VALUE, 'unknown profile', profile)
+            spec = Class.PROFILES[profile] or dict()
+            if fields is None:
+                fields = spec.get('fields')
+            if selects is None:
+                selects = spec.get('selects')
+        if fields is None and selects is None:
+            for name in ['select' + i for i in Class.DEFAULT_SELECTS]:
+                if name not in params:
+                    params[name] = 'extend'
+            return params
+        if fields is not None and 'output' not in params:
+            params['output'] = [Class._id_field()] + [i for i in fields if i != Class._id_field()]
+        if isinstance(selects, dict):
+            selects = selects.items()
+        else:
+            selects = [(i, 'extend') for i in selects or ()]
+        for name, output in selects:
+            if 'select' + name not in params:
+                params['select' + name] = output
+        return params
+
+
+    @classmethod
+    def _from_api(Class, api, attrs):
+        """
+        `Class` instance for `attrs` from a reply, reusing the instance
+        already known to `api`'s identity map and merging `attrs` into it.
+        """
+        identity = getattr(api, '_identity', None)
+        id = attrs.get(Class._id_field())
+        if identity is None or id is None:
+            return Class(api, **attrs)
+        obj = identity.get(Class, id)
+        if obj is None:
+            obj = Class(api, **attrs)
+            identity.add(obj)
+        else:
+            obj._merge(attrs)
+        return obj
+
+
+    @classmethod
+    def _related_class(Class, relation):
+        """
+        `ApiObject` subclass for `relation`, eg `Host` for `'hosts'`.
+        """
+        # Import here to avoid circular imports.
+        from . import Host, Group, Template, Item, Trigger, Application
+        return dict(
+            hosts = Host,
+            groups = Group,
+            templates = Template,
+            items = Item,
+            triggers = Trigger,
+            applications = Application,
+        ).get(relation)
+
+
+    @classmethod
+    def _backref(Class, Related):
+        """
+        `(select param, result key, id field)` telling which of this class's
+        objects each `Related` object from a `*.get` belongs to, or None if
+        `Related`'s `*.get` can't select them.
+        """
+        from . import Application, Group, Host, Item, Template, Trigger
+        if Related is Application:
+            # Applications belong to one host or template, selected singly.
+            if Class in (Host, Template):
+                return ('selectHost', 'host', 'hostid')
+            return None
+        if Class is Template and Related is Host:
+            return ('selectParentTemplates', 'parentTemplates', 'templateid')
+        if Class is Template and Related is Group:
+            return ('selectTemplates', 'templates', 'templateid')
+        if Class is Template:
+            # Objects defined on a template report it as their host.
+            return ('selectHosts', 'hosts', 'hostid')
+        if Related is Group and Class is not Host:
+            # hostgroup.get only selects hosts & templates.
+            return None
+        if Class not in (Host, Group, Item, Trigger, Application):
+            return None
+        return ('select' + Class.__name__ + 's', Class._zabbix_name() + 's', Class._id_field())
+
+
+    @classmethod
+    def _forward_select(Class, relation):
+        """
+        `select*` param loading `relation` via this class's own `*.get`, for
+        relations whose `*.get` can't select this class, or None.
+        """
+        from . import Item, Trigger
+        name = relation.capitalize()
+        if name in Class.DEFAULT_SELECTS or (Class is Trigger and relation == 'groups'):
+            return 'select' + name
+        if Class in (Item, Trigger) and relation == 'hosts':
+            return 'select' + name
+        return None
+
+
+    @classmethod
+    def prefetch(Class, api, objs, relation, **params):
+        """
+        Load `relation` (eg `'triggers'`) for all `objs` with one query,
+        so their lazy relation properties don't each make a request.
+        `params` narrow the related `*.get`; they aren't supported for
+        relations loaded via this class's own `*.get` instead (eg the
+        `groups` of triggers).
+
+        Hosts, groups & templates are loaded via this class's own `*.get`
+        when it can select them, rather than selecting back every item or
+        trigger of each host to match them up.
+        """
+        # Import here to avoid circular imports.
+        from ..api import ApiException
+        Related = Class._related_class(relation)
+        if relation not in Class.RELATIONS or Related is None:
+            raise ApiException(ApiException.INVALID_VALUE, 'unsupported relation', relation)
+        backref = Class._backref(Related)
+        select = Class._forward_select(relation)
+        if params or (backref is not None and relation not in ('hosts', 'groups', 'templates')):
+            select = None
+        if backref is None and select is None:
+            raise ApiException(ApiException.INVALID_VALUE, 'unsupported relation', relation)
+        objs = [i for i in objs if not hasattr(i, '_' + relation)]
+        if not objs:
+            return
+        ids = [i.id for i in objs]
+        by_owner = dict()
+        if select is not None:
+            id_field = Class._id_field()
+            params = {Class._id_field(plural=True): ids, 'output': [id_field], select: 'extend'}
+            result = api.response(Class._api_name() + '.get', **params).get('result')
+            for attrs in result:
+                by_owner[str(attrs[id_field])] = [Related._from_api(api, i) for i in attrs.get(relation) or ()]
+        else:
+            select, key, id_field = backref
+            params = Related._get_params(params)
+            params[Class._id_field(plural=True)] = ids
+            # Just the ids, which are popped before building each object so
+            # they aren't taken for its own (complete) relation.
+            params[select] = [id_field]
+            result = api.response(Related._api_name() + '.get', **params).get('result')
+            for attrs in result:
+                owners = attrs.pop(key, None) or ()
+                obj = Related._from_api(api, attrs)
+                if isinstance(owners, dict):
+                    owners = [owners]
+                for owner in owners:
+                    by_owner.setdefault(str(owner[id_field]), []).append(obj)
+        for obj in objs:
+            setattr(obj, '_' + relation, by_owner.get(str(obj.id), []))
 
 
     def delete(self):
@@ -97,24 +364,15 @@ class ApiObject(object, metaclass=MetaApiObject):
     def __init__(self, api, **attrs):
         # self._id = None
         self._api = api
-        self._props = dict()
-        for name in attrs:
-            if name not in self.PROPS:
-                pass # TODO: log warning?
-            else:
-                spec = self.PROPS[name]
-                # if spec.get('id'):
-                #     self._id = attrs[name]
-                prop = Property(
-                    name = name,
-                    val = attrs[name],
-                    doc = spec.get('doc'),
-                    kind = spec.get('kind', str),
-                    readonly = spec.get('readonly'),
-                    vals = spec.get('vals'),
-                )
-                setattr(self, name, prop)
-                self._props[name] = prop
+        self._props = PropertyMap(self._SPECS)
+        self._merge(attrs)
+
+
+    def _merge(self, attrs):
+        """
+        Load properties & references in `attrs`, keeping any local changes.
+        """
+        self._props.merge(attrs)
         self._process_refs(attrs)
 
 
@@ -133,42 +391,42 @@ class ApiObject(object, metaclass=MetaApiObject):
             self._hosts = []
             for host in attrs['hosts']:
                 if 'name' in host:
-                    self._hosts.append(Host(self._api, **host))
+                    self._hosts.append(Host._from_api(self._api, host))
 
         if isinstance(attrs.get('groups'), list):
             from .group import Group
             self._groups = []
             for group in attrs['groups']:
                 if 'name' in group:
-                    self._groups.append(Group(self._api, **group))
+                    self._groups.append(Group._from_api(self._api, group))
 
         if isinstance(attrs.get('templates'), list):
             from .template import Template
             self._templates = []
             for template in attrs['templates']:
                 if 'name' in template:
-                    self._templates.append(Template(self._api, **template))
+                    self._templates.append(Template._from_api(self._api, template))
 
         if isinstance(attrs.get('items'), list):
             from .item import Item
             self._items = []
             for item in attrs['items']:
                 if 'name' in item:
-                    self._items.append(Item(self._api, **item))
+                    self._items.append(Item._from_api(self._api, item))
 
         if isinstance(attrs.get('triggers'), list):
             from .trigger import Trigger
             self._triggers = []
             for trigger in attrs['triggers']:
                 if 'description' in trigger:
-                    self._triggers.append(Trigger(self._api, **trigger))
+                    self._triggers.append(Trigger._from_api(self._api, trigger))
 
 
     def __unicode__(self):
-        return json.dumps(self.json(), indent=2, ensure_ascii=False)
+        return codec.dumps(self.json(), indent=2)
 
     def __str__(self):
-        return json.dumps(self.json(), indent=2)
+        return codec.dumps(self.json(), indent=2)
 
     def __repr__(self):
         s = self.id
@@ -185,8 +443,7 @@ class ApiObject(object, metaclass=MetaApiObject):
         Return all properties as a dict suitable for JSON.
         """
         d = dict()
-        for name in self._props:
-            prop = getattr(self, name)
+        for name, prop in self._props.items():
             if prop.kind == datetime:
                 d[name] = prop.val.isoformat()
             else:
@@ -210,16 +467,39 @@ class ApiObject(object, metaclass=MetaApiObject):
         """
         Publish any changes to xibbaz.
         """
+        params = self._update_params()
+        if params is None:
+            return None
+        result = self._api.response(self._api_name() + '.update', **params).get('result')
+        self._saved()
+        return result
+
+
+    def _update_params(self):
+        """
+        Params for `<api_name>.update` with only the changed properties, or
+        None if there are none.
+        """
         params = dict()
-        dirty = False
-        for name, prop in self._props.items():
-            if self.PROPS[name].get('id'):
-                params[name] = self.id
+        # Only properties that have been accessed can have been changed.
+        for name, prop in self._props.loaded().items():
             if prop.dirty:
-                params[name] = prop.val
-                dirty = True
-        if dirty:
-            self._api.response('update', params)
+                if prop.kind == datetime:
+                    params[name] = calendar.timegm(prop.val.utctimetuple())
+                else:
+                    params[name] = prop.val
+        if not params:
+            return None
+        params[self._id_field()] = self.id
+        return params
+
+
+    def _saved(self):
+        """
+        Mark all properties as unchanged once published.
+        """
+        for prop in self._props.loaded().values():
+            prop._dirty = False
 
 
     def _repr_html_(self):
@@ -335,11 +615,218 @@ class ApiObject(object, metaclass=MetaApiObject):
         return self._applications
 
 
+    def _relation_params(self):
+        """
+        Params selecting objects linked to this one.
+        """
+        params = dict()
+        params[self._id_field(plural=True)] = self.id
+        return params
+
+
+    def _async_api(self):
+        """
+        `AsyncApi` this object was fetched through, for awaitable variants.
+        """
+        api = getattr(self._api, '_async', None)
+        if api is None:
+            # Import here to avoid circular imports.
+            from ..api import ApiException
+            raise ApiException(ApiException.INVALID_VALUE, 'not fetched via an AsyncApi', self)
+        return api
+
+
+    async def ahosts(self):
+        """
+        Awaitable `hosts` for objects fetched via an `AsyncApi`.
+        """
+        if 'hosts' not in self.RELATIONS:
+            return None
+        if not hasattr(self, '_hosts'):
+            self._hosts = await self._async_api().hosts(**self._relation_params())
+        return self._hosts
+
+
+    async def agroups(self):
+        """
+        Awaitable `groups` for objects fetched via an `AsyncApi`.
+        """
+        if 'groups' not in self.RELATIONS:
+            return None
+        if not hasattr(self, '_groups'):
+            self._groups = await self._async_api().groups(**self._relation_params())
+        return self._groups
+
+
+    async def atemplates(self):
+        """
+        Awaitable `templates` for objects fetched via an `AsyncApi`.
+        """
+        if 'templates' not in self.RELATIONS:
+            return None
+        if not hasattr(self, '_templates'):
+            self._templates = await self._async_api().templates(**self._relation_params())
+        return self._templates
+
+
+    async def aitems(self):
+        """
+        Awaitable `items` for objects fetched via an `AsyncApi`.
+        """
+        if 'items' not in self.RELATIONS:
+            return None
+        if not hasattr(self, '_items'):
+            self._items = await self._async_api().items(**self._relation_params())
+        return self._items
+
+
+    async def atriggers(self):
+        """
+        Awaitable `triggers` for objects fetched via an `AsyncApi`.
+        """
+        if 'triggers' not in self.RELATIONS:
+            return None
+        if not hasattr(self, '_triggers'):
+            self._triggers = await self._async_api().triggers(**self._relation_params())
+        return self._triggers
+
+
+    async def aapplications(self):
+        """
+        Awaitable `applications` for objects fetched via an `AsyncApi`.
+        """
+        if 'applications' not in self.RELATIONS:
+            return None
+        if not hasattr(self, '_applications'):
+            self._applications = await self._async_api().applications(**self._relation_params())
+        return self._applications
+
+
+class PropertyMap(Mapping):
+    """
+    `Property` for each API attribute of an `ApiObject`, keeping the raw
+    values from the server and only wrapping those that get accessed.
+    """
+
+    def __init__(self, specs):
+        self._specs = specs
+        self._raw = dict()
+        self._props = dict()
+
+
+    def __getitem__(self, name):
+        prop = self._props.get(name)
+        if prop is None:
+            prop = Property._load(self._specs[name], self._raw[name])
+            self._props[name] = prop
+        return prop
+
+
+    def __contains__(self, name):
+        return name in self._raw
+
+
+    def __iter__(self):
+        return iter(self._raw)
+
+
+    def __len__(self):
+        return len(self._raw)
+
+
+    def loaded(self):
+        """
+        `{name: Property}` of those created so far.
+        """
+        return self._props
+
+
+    def merge(self, attrs):
+        """
+        Take on newer raw values from `attrs`, except for changed properties.
+        """
+        for name, val in attrs.items():
+            if name not in self._specs:
+                pass # TODO: log warning?
+            elif name in self._props and self._props[name].dirty:
+                pass
+            else:
+                self._raw[name] = val
+                self._props.pop(name, None)
+
+
+class PropertyAttribute(object):
+    """
+    Class attribute giving access to an `ApiObject`'s `Property` by name.
+    """
+
+    __slots__ = ('name',)
+
+    def __init__(self, name):
+        self.name = name
+
+
+    def __get__(self, obj, Class=None):
+        if obj is None:
+            return self
+        try:
+            return obj._props[self.name]
+        except KeyError:
+            raise AttributeError(self.name)
+
+
+class PropertySpec(object):
+    """
+    What's known about a property from an `ApiObject.PROPS` entry, with its
+    doc string & coercion worked out once per class.
+    """
+
+    __slots__ = ('name', 'doc', 'kind', 'readonly', 'vals', 'id', 'coerce', 'xforms')
+
+    def __init__(self, name, doc='', kind=str, readonly=False, vals=None, id=False):
+        self.name = name
+        self.doc = doc or ''
+        if vals:
+            self.doc += '  Acceptable Values:' + ''.join("\n  - {}: {}".format(*i) for i in vals.items())
+        self.kind = kind
+        self.readonly = bool(readonly)
+        self.vals = vals
+        self.id = bool(id)
+        if kind == datetime:
+            self.xforms = (int, datetime.utcfromtimestamp)
+            self.coerce = lambda val: datetime.utcfromtimestamp(int(val))
+        else:
+            self.xforms = (kind,)
+            self.coerce = kind
+
+
 class Property(object):
     """
     Each attribute of an `ApiObject` is wrapped by this class.
     """
 
+    __slots__ = ('_spec', '_val', '_dirty')
+
+    @property
+    def name(self):
+        return self._spec.name
+
+    @property
+    def kind(self):
+        return self._spec.kind
+
+    @property
+    def readonly(self):
+        return self._spec.readonly
+
+    @property
+    def vals(self):
+        return self._spec.vals
+
+    @property
+    def __doc__(self):
+        return self._spec.doc
+
     @property
     def val(self):
         """
@@ -363,7 +850,7 @@ class Property(object):
                 "already defined as: {}".format(self._val),
             )
         try:
-            for xform in self._xforms:
+            for xform in self._spec.xforms:
                 val = xform(val)
         except Exception as e:
             raise ApiException(
@@ -396,23 +883,35 @@ class Property(object):
 
 
     def __init__(self, name='', doc='', val=None, kind=str, readonly=False, vals=None):
-        self.name = name
-        self.__doc__ = doc
-        if vals:
-            self.__doc__ += '  Acceptable Values:' + ''.join("\n  - {}: {}".format(*i) for i in vals.items())
-        if kind == datetime:
-            self._xforms = [int, datetime.utcfromtimestamp]
-        else:
-            self._xforms = [kind]
-        self.kind = kind
-        self.readonly = bool(readonly)
-        self.vals = vals
+        self._spec = PropertySpec(name, doc, kind, readonly, vals)
         # Now set the value so that type checking happens
         self._val = None
         self.val = val
         self._dirty = False
 
 
+    @classmethod
+    def _load(Class, spec, val):
+        """
+        `Property` for a value from the server, trusted to be valid so only
+        coerced to the right type.
+        """
+        prop = Class.__new__(Class)
+        prop._spec = spec
+        prop._dirty = False
+        if val is None:
+            prop._val = None
+            return prop
+        try:
+            prop._val = spec.coerce(val)
+        except Exception:
+            # Let the usual checks deal with it, eg None or a bad value.
+            prop._val = None
+            prop.val = val
+            prop._dirty = False
+        return prop
+
+
     def __format__(self, s):
         return str(self).__format__(s)
 
@@ -471,3 +970,35 @@ class Property(object):
              <td class="doc"><pre>{}</pre></td>
            </tr>
         """.format(self.name, self.val, self.kind.__name__, self.dirty and '*' or '', self.readonly and '*' or '', self.__doc__)
+
+
+# Seconds per unit suffix of Zabbix durations like "90d".
+DURATION_UNITS = dict(s=1, m=60, h=3600, d=86400, w=604800)
+
+
+def _duration(val):
+    """
+    Seconds in a Zabbix duration like "90d", a timedelta or a number, or
+    None if unknown (eg a user macro).
+    """
+    if val is None:
+        return None
+    if isinstance(val, timedelta):
+        return int(val.total_seconds())
+    if isinstance(val, (int, float)):
+        return int(val)
+    match = re.match(r'^\s*(\d+)([smhdw]?)\s*$', val)
+    if not match:
+        return None
+    return int(match.group(1)) * DURATION_UNITS[match.group(2) or 's']
+
+
+def _epoch(ts):
+    """
+    Epoch seconds of a datetime or number, or None.
+    """
+    if ts is None:
+        return None
+    if isinstance(ts, datetime):
+        return int(ts.timestamp())
+    return int(ts)
@@ -1,6 +1,9 @@
 
-from datetime import datetime
-from .api import ApiObject
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from .api import ApiObject, _epoch
 
 
 class Event(ApiObject):
@@ -10,19 +13,81 @@ class Event(ApiObject):
 
     DEFAULT_SELECTS = ('Hosts', 'RelatedObject', 'Tags')
 
+    ID_FROM = 'eventid_from'
+
     RELATIONS = ('hosts',)
 
+    # Sliced fetches aim for about this many events & seconds per request.
+    SLICE_TARGET_SIZE = 5000
+    SLICE_TARGET_SECONDS = 2.0
+
+    # Shortest time slice, in seconds.
+    SLICE_MIN = 60
+
+
+    @classmethod
+    def iter_sliced(Class, api, slice, workers=4, **params):
+        """
+        Generate `Event`s from `time_from` until `time_till` (default now) in
+        `params`, oldest first, fetched a time slice at a time by up to
+        `workers` concurrent requests.  `slice` (seconds or timedelta) is
+        the first slice's length; later slices grow or shrink so replies
+        stay around SLICE_TARGET_SIZE events and SLICE_TARGET_SECONDS.
+
+        The workers share `api` and its `requests` session, which assumes
+        the session's connection pool is safe to use from several threads
+        as it is for plain gets & posts.
+        """
+        if 'time_from' not in params:
+            # Import here to avoid circular imports.
+            from ..api import ApiException
+            raise ApiException(ApiException.INVALID_VALUE, 'slice needs time_from', params)
+        start = _epoch(params.pop('time_from'))
+        end = _epoch(params.pop('time_till', None) or time.time())
+        window = max(int(slice.total_seconds() if isinstance(slice, timedelta) else slice), 1)
+        params['sortfield'] = ['clock', 'eventid']
+        params['sortorder'] = 'ASC'
+
+        def fetch(lo, hi):
+            started = time.time()
+            events = Class.get(api, time_from=lo, time_till=hi, **dict(params))
+            return events, hi - lo + 1, time.time() - started
+
+        pending = deque()
+        with ThreadPoolExecutor(workers) as pool:
+            while start <= end or pending:
+                while start <= end and len(pending) < workers:
+                    hi = min(start + window - 1, end)
+                    pending.append(pool.submit(fetch, start, hi))
+                    start = hi + 1
+                events, span, took = pending.popleft().result()
+                window = Class._next_slice(span, len(events), took)
+                for event in events:
+                    yield event
+
+
+    @classmethod
+    def _next_slice(Class, span, size, took):
+        """
+        Seconds for the next slice after one of `span` seconds returned
+        `size` events in `took` seconds.
+        """
+        factor = min(Class.SLICE_TARGET_SIZE / max(size, 1), Class.SLICE_TARGET_SECONDS / max(took, 0.001))
+        # Change gradually, as event rates are bursty.
+        factor = max(0.25, min(factor, 4.0))
+        return max(int(span * factor), Class.SLICE_MIN)
+
 
     def _process_refs(self, attrs):
         """
         Give references to other ApiObjects the xibbaz treatment.
         """
-        super()
+        super()._process_refs(attrs)
         obj = attrs.get('relatedObject')
-        if obj and attrs.get('object') == 0:
+        if obj and str(attrs.get('object')) == '0':
             from .trigger import Trigger
-            self._trigger = Trigger(self._api, **attrs)
-        else:
+            self._trigger = Trigger._from_api(self._api, obj)
+        elif not hasattr(self, '_trigger'):
             self._trigger = None
 
 
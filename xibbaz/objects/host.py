@@ -12,6 +12,14 @@ class Host(ApiObject):
 
     RELATIONS = ('groups', 'templates', 'applications', 'items', 'triggers', 'screens', 'graphs')
 
+    PROFILES = dict(
+        light = dict(
+            fields = ('host', 'name', 'status', 'available'),
+            selects = (),
+        ),
+        full = None,
+    )
+
 
     @property
     def problems(self):
@@ -21,6 +29,13 @@ class Host(ApiObject):
         return self._api.problems(hostids=self.id)
 
 
+    async def aproblems(self):
+        """
+        Awaitable `problems` for hosts fetched via an `AsyncApi`.
+        """
+        return await self._async_api().problems(hostids=self.id)
+
+
     PROPS = dict(
         hostid = dict(
             doc = "ID of the host.",
@@ -1,6 +1,7 @@
 
+import time
 from datetime import datetime
-from .api import ApiObject
+from .api import ApiObject, _duration, _epoch
 
 
 class Item(ApiObject):
@@ -12,6 +13,14 @@ class Item(ApiObject):
 
     RELATIONS = ('hosts', 'interfaces', 'triggers', 'graphs')
 
+    PROFILES = dict(
+        light = dict(
+            fields = ('hostid', 'key_', 'name', 'value_type', 'units', 'lastvalue', 'lastclock'),
+            selects = (),
+        ),
+        full = None,
+    )
+
     # See `value_type` property
     TYPE_FLOAT = 0
     TYPE_CHAR  = 1
@@ -19,11 +28,171 @@ class Item(ApiObject):
     TYPE_INT   = 3
     TYPE_TEXT  = 4
 
+    # Samples per `history.get` call when paging through history.
+    HISTORY_PAGE_SIZE = 10000
+
+    # Hours of trends per `trend.get` call, which can't sort or page.
+    TRENDS_PAGE_SIZE = 24 * 30
+
+    # Seconds covered by each `trend.get` row.
+    TREND_PERIOD = 3600
+
+    # Longest window `series` returns raw history for by default.
+    SERIES_HISTORY_WINDOW = 7 * 86400
+
 
     def history(self, ts_from=None, ts_to=None, limit=10):
         """
         `(ts, val)` for latest `limit` from `ts_from` until `ts_to`.
         """
+        params = self._history_params(ts_from, ts_to, limit)
+        return [(i['clock'], self._typed_value(i['value'])) for i in
+                self._api.response('history.get', **params).get('result')]
+
+
+    async def ahistory(self, ts_from=None, ts_to=None, limit=10):
+        """
+        Awaitable `history` for items fetched via an `AsyncApi`.
+        """
+        params = self._history_params(ts_from, ts_to, limit)
+        reply = await self._async_api().response('history.get', **params)
+        return [(i['clock'], self._typed_value(i['value'])) for i in reply.get('result')]
+
+
+    def history_array(self, ts_from=None, ts_to=None, page_size=None):
+        """
+        `History` arrays of every sample from `ts_from` until `ts_to`,
+        paging through `history.get` as needed.  Served via the api's
+        `history_store` if it has one.
+        """
+        from ..timeseries import History
+        store = self._api._history_store
+        if store is not None:
+            return store.fetch(self._api, [self], ts_from, ts_to, page_size)[int(self.id)]
+        value_type = self.value_type.val
+        pages = self._history_pages(self._api, [self.id], value_type, ts_from, ts_to, page_size)
+        return History._from_pages(pages, value_type)
+
+
+    def trends(self, ts_from=None, ts_to=None, page_size=None):
+        """
+        `History` of hourly min/avg/max/count rollups from `ts_from` until
+        `ts_to`, fetched `page_size` hours at a time.
+        """
+        from ..timeseries import History
+        value_type = self.value_type.val
+        pages = self._trend_pages(self._api, [self.id], ts_from, ts_to, page_size)
+        return History._from_trend_pages(pages, value_type)
+
+
+    def series(self, ts_from=None, ts_to=None, resolution=None):
+        """
+        `History` from `ts_from` until `ts_to` of either raw history or
+        trends, whichever suits the window and the item's retention.  Pass
+        `resolution` (seconds or timedelta) to ask for samples at least that
+        far apart; trends are used for an hour or more.  Without `ts_from`,
+        all the raw history kept is returned unless `resolution` asks for
+        trends.
+        """
+        if self._use_trends(ts_from, ts_to, resolution):
+            return self.trends(ts_from, ts_to)
+        return self.history_array(ts_from, ts_to)
+
+
+    def _use_trends(self, ts_from, ts_to, resolution):
+        """
+        Whether `series` should read trends rather than raw history.
+        """
+        if self.value_type.val not in (self.TYPE_FLOAT, self.TYPE_INT):
+            return False
+        # The `history` & `trends` props are shadowed by methods.
+        keep_history = _duration(self._props['history'].val) if 'history' in self._props else None
+        keep_trends = _duration(self._props['trends'].val) if 'trends' in self._props else None
+        if keep_trends == 0:
+            return False
+        now = time.time()
+        start = _epoch(ts_from)
+        end = _epoch(ts_to) or now
+        if start is not None and keep_history is not None and start < now - keep_history:
+            return True
+        resolution = _duration(resolution)
+        if resolution is not None:
+            return resolution >= self.TREND_PERIOD
+        return start is not None and end - start > self.SERIES_HISTORY_WINDOW
+
+
+    @classmethod
+    def _trend_pages(Class, api, itemids, ts_from=None, ts_to=None, page_size=None):
+        """
+        Generate pages of `trend.get` rows for `itemids`, one per window of
+        `page_size` hours from `ts_from` until `ts_to`.
+        """
+        params = dict(
+            output = ['itemid', 'clock', 'num', 'value_min', 'value_avg', 'value_max'],
+            itemids = itemids,
+        )
+        start, end = _epoch(ts_from), _epoch(ts_to)
+        if start is None:
+            if end is not None:
+                params['time_till'] = end
+            yield api.response('trend.get', **params).get('result')
+            return
+        if end is None:
+            end = int(time.time())
+        window = (page_size or Class.TRENDS_PAGE_SIZE) * Class.TREND_PERIOD
+        while start <= end:
+            params['time_from'] = start
+            params['time_till'] = min(start + window - 1, end)
+            rows = api.response('trend.get', **params).get('result')
+            if rows:
+                yield rows
+            start += window
+
+
+    @classmethod
+    def _history_pages(Class, api, itemids, value_type, ts_from=None, ts_to=None, page_size=None):
+        """
+        Generate pages of `history.get` rows for `itemids`, oldest first,
+        until the range from `ts_from` until `ts_to` is covered.
+        """
+        limit = page_size or Class.HISTORY_PAGE_SIZE
+        params = dict(
+            output = 'extend',
+            history = value_type,
+            itemids = itemids,
+            sortfield = 'clock',
+            sortorder = 'ASC',
+        )
+        if ts_from is not None:
+            params['time_from'] = _epoch(ts_from)
+        if ts_to is not None:
+            params['time_till'] = _epoch(ts_to)
+        # Samples already returned for the second the next page starts from.
+        seen = set()
+        while True:
+            params['limit'] = limit
+            rows = api.response('history.get', **params).get('result')
+            full = len(rows) >= limit
+            last = rows[-1]['clock'] if rows else None
+            if full and int(last) == params.get('time_from'):
+                # A whole page within one second; can't page past it by clock.
+                limit *= 2
+                continue
+            page = rows
+            if seen:
+                page = [i for i in rows if (i['itemid'], i['clock'], i.get('ns')) not in seen]
+            if page:
+                yield page
+            if not full:
+                return
+            params['time_from'] = int(last)
+            seen = set((i['itemid'], i['clock'], i.get('ns')) for i in rows if i['clock'] == last)
+
+
+    def _history_params(self, ts_from, ts_to, limit):
+        """
+        Params for a `history.get` call.
+        """
         params = dict(
             output = 'extend',
             history = self.value_type.val,
@@ -36,8 +205,7 @@ class Item(ApiObject):
             params['time_from'] = ts_from.strftime('%s')
         if ts_to:
             params['time_till'] = ts_to.strftime('%s')
-        return [(i['clock'], self._typed_value(i['value'])) for i in
-                self._api.response('history.get', **params).get('result')]
+        return params
 
 
     def _typed_value(self, val):
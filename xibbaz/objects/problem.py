@@ -10,6 +10,8 @@ class Problem(ApiObject):
 
     DEFAULT_SELECTS = ()
 
+    ID_FROM = 'eventid_from'
+
     RELATIONS = ()
 
     @classmethod
@@ -29,6 +31,71 @@ class Problem(ApiObject):
         self._trigger = None
 
 
+    # Output of embedded hosts when loading related objects in bulk.
+    HOST_FIELDS = ('hostid', 'host', 'name')
+
+    @classmethod
+    def load_related(Class, api, problems, events=True, triggers=True):
+        """
+        Load the `event` and/or `trigger` of all `problems`, along with their
+        hosts, using one `event.get` and one `trigger.get`.
+        """
+        if events:
+            ids = [i.eventid.val for i in problems if i._event is None]
+            if ids:
+                Class._set_events(problems, api.events(**Class._events_params(ids)))
+        if triggers:
+            ids = Class._trigger_ids(problems)
+            if ids:
+                Class._set_triggers(problems, api.triggers(**Class._triggers_params(ids)))
+
+
+    @classmethod
+    async def aload_related(Class, api, problems, events=True, triggers=True):
+        """
+        Awaitable `load_related` for use with an `AsyncApi`.
+        """
+        if events:
+            ids = [i.eventid.val for i in problems if i._event is None]
+            if ids:
+                Class._set_events(problems, await api.events(**Class._events_params(ids)))
+        if triggers:
+            ids = Class._trigger_ids(problems)
+            if ids:
+                Class._set_triggers(problems, await api.triggers(**Class._triggers_params(ids)))
+
+
+    @classmethod
+    def _events_params(Class, ids):
+        return dict(eventids=ids, selects=dict(Hosts=list(Class.HOST_FIELDS)))
+
+
+    @classmethod
+    def _triggers_params(Class, ids):
+        return dict(triggerids=ids, selects=dict(Hosts=list(Class.HOST_FIELDS)), expandDescription=True)
+
+
+    @staticmethod
+    def _trigger_ids(problems):
+        return sorted(set(i.objectid.val for i in problems if i.object.val == 0 and i._trigger is None))
+
+
+    @staticmethod
+    def _set_events(problems, events):
+        by_id = dict((i.id, i) for i in events)
+        for problem in problems:
+            if problem._event is None:
+                problem._event = by_id.get(problem.eventid.val)
+
+
+    @staticmethod
+    def _set_triggers(problems, triggers):
+        by_id = dict((i.id, i) for i in triggers)
+        for problem in problems:
+            if problem._trigger is None and problem.object.val == 0:
+                problem._trigger = by_id.get(problem.objectid.val)
+
+
     @property
     def event(self):
         """
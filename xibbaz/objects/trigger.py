@@ -12,6 +12,14 @@ class Trigger(ApiObject):
 
     RELATIONS = ('hosts', 'groups')
 
+    PROFILES = dict(
+        light = dict(
+            fields = ('description', 'priority', 'value', 'status', 'lastchange'),
+            selects = (),
+        ),
+        full = None,
+    )
+
 
     @classmethod
     def _text_field(self):
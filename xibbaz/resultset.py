@@ -0,0 +1,105 @@
+"""
+Columnar results for analysis with NumPy & Pandas.
+"""
+
+from datetime import datetime
+from operator import itemgetter
+import numpy
+
+__all__ = [
+    'ResultSet',
+]
+
+
+class ResultSet(object):
+    """
+    Columns of a `*.get` result built straight from the reply, without
+    building an `ApiObject` per row.  Each property becomes a NumPy array
+    typed by its `PROPS` kind:
+
+    - `int` (including `vals` enums): int64, or float64 with NaN for gaps
+    - `datetime`: datetime64[s], with NaT for gaps
+    - otherwise: object arrays of str, with None for gaps
+
+    Relations embedded in the reply (eg `hosts`) are not included.
+    """
+
+    def __init__(self, Class, rows):
+        self.Class = Class
+        specs = Class._SPECS
+        if not isinstance(rows, list):
+            rows = list(rows)
+        names = set().union(*rows).intersection(specs) if rows else ()
+        self._len = len(rows)
+        self.columns = dict((name, _column(specs[name], _values(rows, name))) for name in names)
+
+
+    def __len__(self):
+        return self._len
+
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+
+    def __contains__(self, name):
+        return name in self.columns
+
+
+    def __repr__(self):
+        return '<ResultSet {} x {}: {}>'.format(self.Class.__name__, self._len, ', '.join(sorted(self.columns)))
+
+
+    def to_frame(self):
+        """
+        `pandas.DataFrame` of the columns, with `vals` enums as categoricals
+        labelled by their descriptions.
+        """
+        import pandas
+        data = dict()
+        for name, col in self.columns.items():
+            vals = self.Class._SPECS[name].vals
+            if vals:
+                keys = sorted(vals)
+                labels = [vals[i] for i in keys]
+                col = pandas.Categorical(col, categories=keys)
+                if len(set(labels)) == len(labels):
+                    col = col.rename_categories(labels)
+            data[name] = col
+        return pandas.DataFrame(data, columns=sorted(data))
+
+
+def _values(rows, name):
+    """
+    `[row[name]]`, with None for rows lacking `name`.
+    """
+    try:
+        # Every row normally has the same fields, so try the fast way first.
+        return list(map(itemgetter(name), rows))
+    except KeyError:
+        return [i.get(name) for i in rows]
+
+
+def _column(spec, values):
+    """
+    NumPy array of raw reply `values` typed by `spec.kind`.
+    """
+    if spec.kind in (int, datetime):
+        missing = None
+        if None in values:
+            missing = numpy.array([i is None for i in values])
+            values = ['0' if i is None else i for i in values]
+        ints = numpy.fromiter(map(int, values), numpy.int64, len(values))
+        if spec.kind == datetime:
+            col = ints.astype('datetime64[s]')
+            if missing is not None:
+                col[missing] = numpy.datetime64('NaT')
+            return col
+        if missing is not None:
+            col = ints.astype(numpy.float64)
+            col[missing] = numpy.nan
+            return col
+        return ints
+    col = numpy.empty(len(values), dtype=object)
+    col[:] = values
+    return col
@@ -0,0 +1,216 @@
+"""
+Persistent local cache of configuration objects.
+"""
+
+import sqlite3
+import threading
+import time
+from . import codec, objects
+
+__all__ = [
+    'MetadataStore',
+]
+
+
+class MetadataStore(object):
+    """
+    SQLite copy of hosts, groups, templates & items for use with
+    `Api(server, store=MetadataStore(path))`, so short-lived scripts don't
+    refetch a slowly changing inventory on every run.
+
+    `Api.hosts`, `groups`, `templates` & `items` are served from the store when their params are simple id or name lookups without
+    selects; anything else goes to the server, as do ids & names missing
+    from the store, which are then added to it.  Objects are stored without
+    their relations, which load lazily as usual.
+
+    An object type is loaded the first time it's needed, a page at a time,
+    and refreshed once older than `max_age` seconds, in a background thread
+    when `background` is true.  Refreshing fetches the list of ids to pick
+    up new and deleted objects.  Objects changed in place (eg renamed) are
+    picked up by a full refresh, done once the last is older than
+    `full_age` seconds.  Item `lastvalue`s & such are only as fresh as the
+    last refresh, so use `Item.get` for live values.  Triggers aren't
+    stored since so much of them is live state.
+    """
+
+    CLASSES = (objects.Host, objects.Group, objects.Template, objects.Item)
+
+    # Ids fetched per request when loading objects.
+    PAGE_SIZE = 1000
+
+    def __init__(self, path, max_age=3600, full_age=86400, background=True):
+        self.max_age = max_age
+        self.full_age = full_age
+        self.background = background
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.RLock()
+        self._refreshing = dict()
+        with self._lock, self._db:
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS objects (
+                    kind TEXT, id INTEGER, name TEXT, data TEXT,
+                    PRIMARY KEY (kind, id)
+                )""")
+            self._db.execute("CREATE INDEX IF NOT EXISTS objects_name ON objects (kind, name)")
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS refreshed (
+                    kind TEXT PRIMARY KEY, at REAL, full_at REAL
+                )""")
+
+
+    def query(self, api, Class, params):
+        """
+        `[attrs]` matching `params` from the store, or None if `params`
+        can't be answered locally.  Ids & names not in the store are looked
+        up on the server.
+        """
+        if Class not in self.CLASSES:
+            return None
+        sql = ['SELECT data FROM objects WHERE kind = ?']
+        args = [Class._api_name()]
+        ids = names = None
+        for name, val in params.items():
+            if name == Class._id_field(plural=True):
+                ids = val if isinstance(val, (list, tuple, set)) else [val]
+                sql.append('AND id IN ({})'.format(','.join('?' * len(ids))))
+                args.extend(int(i) for i in ids)
+            elif name == 'filter' and list(val) == [Class._text_field()]:
+                names = val[Class._text_field()]
+                names = names if isinstance(names, (list, tuple, set)) else [names]
+                sql.append('AND name IN ({})'.format(','.join('?' * len(names))))
+                args.extend(names)
+            elif name == 'output' and val == 'extend':
+                pass
+            elif name == 'limit':
+                pass
+            else:
+                return None
+        self._ensure(api, Class)
+        sql.append('ORDER BY id')
+        if 'limit' in params:
+            sql.append('LIMIT {:d}'.format(int(params['limit'])))
+        sql = ' '.join(sql)
+        with self._lock:
+            rows = [codec.loads(i[0]) for i in self._db.execute(sql, args)]
+        missing = self._missing(Class, rows, ids, names)
+        if missing:
+            result = api.response(Class._api_name() + '.get', **self._params(Class, missing)).get('result')
+            if result:
+                self._upsert(Class, result)
+                with self._lock:
+                    rows = [codec.loads(i[0]) for i in self._db.execute(sql, args)]
+        return rows
+
+
+    def refresh(self, api, Class, full=False):
+        """
+        Bring the stored `Class` objects up to date with the server.
+        """
+        kind = Class._api_name()
+        id_field = Class._id_field()
+        with self._lock:
+            row = self._db.execute('SELECT full_at FROM refreshed WHERE kind = ?', (kind,)).fetchone()
+            local = set(i[0] for i in self._db.execute('SELECT id FROM objects WHERE kind = ?', (kind,)))
+        started = time.time()
+        full = full or row is None
+        result = api.response(kind + '.get', output=[id_field]).get('result')
+        remote = set(int(i[id_field]) for i in result)
+        fetch = remote if full else remote - local
+        for page in self._fetch(api, Class, sorted(fetch)):
+            self._upsert(Class, page)
+        # Whatever is only stored locally no longer exists on the server.
+        with self._lock, self._db:
+            self._db.executemany('DELETE FROM objects WHERE kind = ? AND id = ?', [(kind, i) for i in local - remote])
+            self._db.execute(
+                'INSERT OR REPLACE INTO refreshed (kind, at, full_at) VALUES (?, ?, ?)',
+                (kind, started, started if full else row[0]),
+            )
+
+
+    def refresh_async(self, api, Class, full=False):
+        """
+        Start refreshing `Class` objects in a background thread, unless
+        already underway, and return the thread.  The thread is a daemon so
+        it doesn't hold up the exit of a short-lived script.
+        """
+        with self._lock:
+            thread = self._refreshing.get(Class)
+            if thread is None or not thread.is_alive():
+                thread = threading.Thread(target=self.refresh, args=(api, Class, full), daemon=True)
+                self._refreshing[Class] = thread
+                thread.start()
+        return thread
+
+
+    def clear(self):
+        """
+        Drop all stored objects.
+        """
+        with self._lock, self._db:
+            self._db.execute('DELETE FROM objects')
+            self._db.execute('DELETE FROM refreshed')
+
+
+    def _ensure(self, api, Class):
+        """
+        Load `Class` objects if never loaded, or kick off a refresh if stale.
+        """
+        with self._lock:
+            row = self._db.execute('SELECT at, full_at FROM refreshed WHERE kind = ?', (Class._api_name(),)).fetchone()
+        now = time.time()
+        if row is None:
+            self.refresh(api, Class)
+        elif row[0] + self.max_age < now:
+            full = (row[1] or 0) + self.full_age < now
+            if self.background:
+                self.refresh_async(api, Class, full)
+            else:
+                self.refresh(api, Class, full)
+
+
+    @staticmethod
+    def _missing(Class, rows, ids, names):
+        """
+        `(param, values)` of the `ids` or `names` asked for but not in `rows`.
+        """
+        if ids is not None:
+            found = set(str(i[Class._id_field()]) for i in rows)
+            missing = [i for i in ids if str(i) not in found]
+            return missing and (Class._id_field(plural=True), missing)
+        if names is not None:
+            found = set(i.get(Class._text_field()) for i in rows)
+            missing = [i for i in names if i not in found]
+            return missing and ('filter', {Class._text_field(): missing})
+        return None
+
+
+    @staticmethod
+    def _params(Class, lookup=None):
+        """
+        Params for fetching objects as stored, ie all fields but no relations.
+        """
+        params = dict(output='extend')
+        if lookup:
+            params[lookup[0]] = lookup[1]
+        return Class._get_params(params, selects=())
+
+
+    def _upsert(self, Class, result):
+        """
+        Store `result` attrs, replacing any with the same ids.
+        """
+        kind = Class._api_name()
+        id_field = Class._id_field()
+        rows = [(kind, int(i[id_field]), i.get(Class._text_field()), codec.dumps(i)) for i in result]
+        with self._lock, self._db:
+            self._db.executemany('INSERT OR REPLACE INTO objects (kind, id, name, data) VALUES (?, ?, ?, ?)', rows)
+
+
+    def _fetch(self, api, Class, ids):
+        """
+        Generate pages of stored attrs for `ids`.
+        """
+        method = Class._api_name() + '.get'
+        for i in range(0, len(ids), self.PAGE_SIZE):
+            params = self._params(Class, (Class._id_field(plural=True), ids[i:i + self.PAGE_SIZE]))
+            yield api.response(method, **params).get('result')
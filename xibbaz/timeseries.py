@@ -0,0 +1,459 @@
+"""
+NumPy time series of item history.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
+import numpy
+from .api import ApiException
+from .objects import Item
+from .objects.api import _duration
+
+__all__ = [
+    'History',
+    'fetch',
+    'fetch_frame',
+    'to_frame',
+    'delta',
+    'rate',
+    'aggregate',
+]
+
+
+# Value arrays by `Item.value_type`; anything else is kept as str.
+VALUE_DTYPES = {
+    Item.TYPE_FLOAT: numpy.float64,
+    Item.TYPE_INT: numpy.uint64,
+}
+
+# Seconds covered by each `trend.get` row.
+TREND_PERIOD = Item.TREND_PERIOD
+
+# Calendar periods `aggregate` can bucket by (in UTC), as NumPy units.
+PERIODS = dict(day='D', week='W', month='M', year='Y')
+
+# Per bucket results `aggregate` can compute, besides percentiles.
+STATS = ('min', 'max', 'avg', 'sum', 'first', 'last', 'count', 'delta', 'rate')
+
+
+class History(object):
+    """
+    Samples of an item as parallel NumPy arrays ordered by time:
+
+    - `clock`: int64 epoch seconds
+    - `ns`: int64 nanoseconds within `clock`, or None if not reported
+    - `value`: float64, uint64 or object (str) arrays by `value_type`
+
+    For trends, `value` is the float64 average over each `period` (3600s)
+    starting at `clock`, with `value_min`, `value_max` & `num` (samples per
+    period) alongside.  These are None for raw history.
+    """
+
+    def __init__(self, clock, value, ns=None, value_min=None, value_max=None, num=None, period=None):
+        self.clock = clock
+        self.value = value
+        self.ns = ns
+        self.value_min = value_min
+        self.value_max = value_max
+        self.num = num
+        self.period = period
+
+
+    def __len__(self):
+        return len(self.clock)
+
+
+    def __repr__(self):
+        kind = 'trends' if self.period else 'history'
+        return '<History {} x {} {}>'.format(len(self), self.value.dtype, kind)
+
+
+    @property
+    def times(self):
+        """
+        datetime64[ns] array of the sample times.
+        """
+        times = self.clock.astype('datetime64[s]').astype('datetime64[ns]')
+        if self.ns is not None:
+            times = times + self.ns.astype('timedelta64[ns]')
+        return times
+
+
+    @classmethod
+    def _from_cols(Class, cols, lo=None, hi=None, period=None):
+        """
+        `History` of the `[lo:hi]` slice of decoded columns.
+        """
+        cols = dict((k, None if v is None else v[lo:hi]) for k, v in cols.items())
+        cols.pop('itemid', None)
+        return Class(period=period, **cols)
+
+
+    @classmethod
+    def _from_pages(Class, pages, value_type):
+        """
+        `History` of `history.get` row pages for a single item.
+        """
+        return Class._from_cols(_decode_pages(pages, value_type))
+
+
+    @classmethod
+    def _from_trend_pages(Class, pages, value_type):
+        """
+        `History` of `trend.get` row pages for a single item.
+        """
+        return Class._from_cols(_decode_pages(pages, value_type, _decode_trends), period=TREND_PERIOD)
+
+
+def fetch(api, items, ts_from=None, ts_to=None, page_size=None, workers=4):
+    """
+    `{itemid: History}` of `items` from `ts_from` until `ts_to`.  Items
+    are grouped by `value_type` since `history.get` takes one type per
+    call, and the groups are paged through concurrently by up to `workers`
+    threads.  Items without samples get an empty `History`.
+    """
+    histories = dict()
+    for itemids, value_type, cols in _fetch_groups(api, items, ts_from, ts_to, page_size, workers):
+        bounds = _bounds(cols)
+        for id in itemids:
+            lo, hi = bounds.get(int(id), (0, 0))
+            histories[int(id)] = History._from_cols(cols, lo, hi)
+    return histories
+
+
+def to_frame(histories):
+    """
+    Long `pandas.DataFrame` of itemid, clock, ns & value for a
+    `{itemid: History}` map.
+    """
+    import pandas
+    columns = ['itemid', 'clock', 'ns', 'value']
+    frames = []
+    for id, hist in histories.items():
+        frames.append(pandas.DataFrame(dict(
+            itemid = numpy.full(len(hist), id, numpy.int64),
+            clock = hist.clock,
+            ns = hist.ns if hist.ns is not None else numpy.zeros(len(hist), numpy.int64),
+            value = hist.value,
+        ), columns=columns))
+    if not frames:
+        return pandas.DataFrame(columns=columns)
+    return pandas.concat(frames, ignore_index=True)
+
+
+def fetch_frame(api, items, ts_from=None, ts_to=None, page_size=None, workers=4):
+    """
+    Long `pandas.DataFrame` of itemid, clock, ns & value for `fetch`.
+    """
+    import pandas
+    frames = []
+    for itemids, value_type, cols in _fetch_groups(api, items, ts_from, ts_to, page_size, workers):
+        frames.append(pandas.DataFrame(dict(
+            itemid = cols['itemid'],
+            clock = cols['clock'],
+            ns = cols['ns'] if cols['ns'] is not None else numpy.zeros(len(cols['clock']), numpy.int64),
+            value = cols['value'],
+        ), columns=['itemid', 'clock', 'ns', 'value']))
+    if not frames:
+        return pandas.DataFrame(columns=['itemid', 'clock', 'ns', 'value'])
+    return pandas.concat(frames, ignore_index=True)
+
+
+def delta(hist, per_second=False, max_gap=None):
+    """
+    `History` of the change between consecutive samples, as stored for an
+    item with `delta` "simple change", or "speed per second" with
+    `per_second`.  Like Zabbix, a sample less than the one before (eg a
+    counter reset) yields nothing, and neither does one more than `max_gap`
+    seconds after the one before.
+    """
+    keep, change, elapsed = _steps(hist, max_gap)
+    value = change[keep]
+    if per_second:
+        value = value / elapsed[keep]
+    ns = None if hist.ns is None else hist.ns[1:][keep]
+    return History(hist.clock[1:][keep], value, ns)
+
+
+def rate(hist, max_gap=None):
+    """
+    `delta` per second.
+    """
+    return delta(hist, True, max_gap)
+
+
+def aggregate(hist, interval, stats=('min', 'avg', 'max', 'count'), percentiles=(), fill=False, max_gap=None):
+    """
+    `{name: array}` of each of `stats` (see STATS) per bucket of `interval`,
+    plus `pNN` for each of `percentiles` and the start of each bucket as
+    `clock`.  `interval` is seconds, a timedelta, a duration like "5m" or
+    one of PERIODS for calendar buckets.
+
+    `delta` is the sum of the changes between samples ending in the bucket,
+    skipping counter resets & `max_gap` as `delta()` does, and `rate` is
+    that over the seconds those changes span.  Buckets without samples are
+    left out, unless `fill` in which case their count is 0 and the rest NaN.
+
+    Trends are aggregated from their min, max & sample counts, weighting
+    averages by `num`; their `delta`, `rate` & percentiles use the hourly
+    averages.
+    """
+    for name in stats:
+        if name not in STATS:
+            raise ApiException(ApiException.INVALID_VALUE, 'unknown stat', name)
+    value = hist.value
+    numeric = value.dtype != object
+    if not numeric and (set(stats) - set(['first', 'last', 'count']) or percentiles):
+        raise ApiException(ApiException.INVALID_VALUE, 'stats need numeric values', list(stats))
+
+    starts = _bucket_starts(hist.clock, interval)
+    n = len(starts)
+    edges = numpy.flatnonzero(starts[1:] != starts[:-1]) + 1
+    lo = numpy.concatenate(([0], edges)) if n else numpy.empty(0, numpy.int64)
+    hi = numpy.append(edges, n) if n else numpy.empty(0, numpy.int64)
+    # Bucket of every sample.
+    ids = numpy.zeros(n, numpy.int64)
+    ids[edges] = 1
+    ids = numpy.cumsum(ids)
+
+    out = dict(clock=starts[lo])
+    count = hi - lo
+    if hist.period:
+        weights = hist.num.astype(numpy.float64)
+        vmin, vmax = hist.value_min, hist.value_max
+    else:
+        weights = None
+        vmin = vmax = value
+    for name in stats:
+        if name == 'count':
+            out[name] = count if weights is None else _sums(hist.num, lo).astype(numpy.int64)
+        elif name == 'first':
+            out[name] = value[lo]
+        elif name == 'last':
+            out[name] = value[hi - 1]
+        elif name == 'min':
+            out[name] = numpy.minimum.reduceat(vmin, lo) if n else vmin[:0]
+        elif name == 'max':
+            out[name] = numpy.maximum.reduceat(vmax, lo) if n else vmax[:0]
+        elif name in ('sum', 'avg'):
+            floats = value.astype(numpy.float64)
+            if weights is None:
+                total, num = _sums(floats, lo), count
+            else:
+                total, num = _sums(floats * weights, lo), _sums(weights, lo)
+            out[name] = total if name == 'sum' else total / num
+    if 'delta' in stats or 'rate' in stats:
+        keep, change, elapsed = _steps(hist, max_gap)
+        step_ids = ids[1:][keep]
+        nb = len(lo)
+        total = numpy.bincount(step_ids, change[keep], nb).astype(numpy.float64)
+        if 'delta' in stats:
+            out['delta'] = total
+        if 'rate' in stats:
+            seconds = numpy.bincount(step_ids, elapsed[keep], nb)
+            with numpy.errstate(divide='ignore', invalid='ignore'):
+                out['rate'] = numpy.where(seconds > 0, total / seconds, numpy.nan)
+    if percentiles:
+        # Sort by bucket then value with one int key, much quicker than lexsort.
+        rank = numpy.empty(n, numpy.int64)
+        rank[numpy.argsort(value)] = numpy.arange(n)
+        ordered = value[numpy.argsort(ids * n + rank)]
+        for q in percentiles:
+            out['p{:g}'.format(q)] = _percentile(ordered, lo, count, q)
+    if fill and n:
+        out = _fill(out, interval)
+    return out
+
+
+def _fetch_groups(api, items, ts_from, ts_to, page_size, workers):
+    """
+    `[(itemids, value_type, cols)]` with one paged query per `value_type`.
+    """
+    groups = dict()
+    for item in items:
+        groups.setdefault(item.value_type.val, []).append(item.id)
+    if not groups:
+        return []
+
+    def load(value_type):
+        itemids = groups[value_type]
+        pages = Item._history_pages(api, itemids, value_type, ts_from, ts_to, page_size)
+        return itemids, value_type, _decode_pages(pages, value_type)
+
+    with ThreadPoolExecutor(min(workers, len(groups))) as pool:
+        return list(pool.map(load, sorted(groups)))
+
+
+def _bounds(cols):
+    """
+    `{itemid: (lo, hi)}` slice of each item in decoded columns.
+    """
+    ids, starts = numpy.unique(cols['itemid'], return_index=True)
+    ends = numpy.append(starts[1:], len(cols['itemid']))
+    return dict(zip(ids.tolist(), zip(starts.tolist(), ends.tolist())))
+
+
+def _steps(hist, max_gap):
+    """
+    `(keep, change, elapsed)` between consecutive samples, where `keep`
+    masks out counter resets & gaps longer than `max_gap` seconds.
+    """
+    value = hist.value
+    prev, cur = value[:-1], value[1:]
+    keep = cur >= prev
+    if value.dtype == numpy.uint64:
+        # Subtract as ints so big counters keep their precision.
+        change = numpy.where(keep, cur - numpy.minimum(prev, cur), 0).astype(numpy.float64)
+    else:
+        change = cur.astype(numpy.float64) - prev
+    times = hist.clock.astype(numpy.float64)
+    if hist.ns is not None:
+        times += hist.ns * 1e-9
+    elapsed = numpy.diff(times)
+    keep &= elapsed > 0
+    if max_gap is not None:
+        keep &= elapsed <= _duration(max_gap)
+    return keep, change, elapsed
+
+
+def _bucket_starts(clock, interval):
+    """
+    Epoch second each of `clock` falls into by `interval`.
+    """
+    unit = PERIODS.get(interval)
+    if unit == 'W':
+        # NumPy weeks start on Thursday; start ours on Monday.
+        days = clock // 86400
+        return (days - (days + 3) % 7) * 86400
+    if unit:
+        return clock.astype('datetime64[s]').astype('datetime64[' + unit + ']').astype('datetime64[s]').astype(numpy.int64)
+    seconds = _duration(interval)
+    if not seconds:
+        raise ApiException(ApiException.INVALID_VALUE, 'invalid interval', interval)
+    return clock - clock % seconds
+
+
+def _sums(values, lo):
+    """
+    Sum of `values` in each bucket starting at `lo`.
+    """
+    if not len(values):
+        return values[:0]
+    return numpy.add.reduceat(values, lo)
+
+
+def _percentile(ordered, lo, count, q):
+    """
+    `q`th percentile of each bucket of `ordered`, interpolating linearly
+    like `numpy.percentile`.
+    """
+    pos = (count - 1) * (q / 100.0)
+    below = numpy.floor(pos).astype(numpy.int64)
+    above = numpy.ceil(pos).astype(numpy.int64)
+    a = ordered[lo + below].astype(numpy.float64)
+    b = ordered[lo + above].astype(numpy.float64)
+    return a + (b - a) * (pos - below)
+
+
+def _fill(out, interval):
+    """
+    `aggregate` results with a row for every bucket from first to last.
+    """
+    clock = out['clock']
+    unit = PERIODS.get(interval)
+    if unit in ('M', 'Y'):
+        span = clock[[0, -1]].astype('datetime64[s]').astype('datetime64[' + unit + ']')
+        grid = numpy.arange(span[0], span[1] + 1).astype('datetime64[s]').astype(numpy.int64)
+    else:
+        step = 7 * 86400 if unit == 'W' else 86400 if unit else _duration(interval)
+        grid = numpy.arange(clock[0], clock[-1] + 1, step)
+    at = numpy.searchsorted(grid, clock)
+    filled = dict(clock=grid)
+    for name, col in out.items():
+        if name == 'clock':
+            continue
+        if name == 'count':
+            full = numpy.zeros(len(grid), col.dtype)
+        elif col.dtype == object:
+            full = numpy.full(len(grid), None, object)
+        else:
+            full = numpy.full(len(grid), numpy.nan)
+        full[at] = col
+        filled[name] = full
+    return filled
+
+
+def _ints(rows, name, dtype=numpy.int64):
+    """
+    `row[name]` of every row as an int array.
+    """
+    return numpy.fromiter(map(int, map(itemgetter(name), rows)), dtype, len(rows))
+
+
+def _typed(rows, name, value_type):
+    """
+    `row[name]` of every row as an array typed by `value_type`.
+    """
+    n = len(rows)
+    values = map(itemgetter(name), rows)
+    dtype = VALUE_DTYPES.get(value_type)
+    if dtype is numpy.float64:
+        return numpy.fromiter(map(float, values), dtype, n)
+    if dtype is not None:
+        return numpy.fromiter(map(int, values), dtype, n)
+    col = numpy.empty(n, dtype=object)
+    col[:] = list(values)
+    return col
+
+
+def _decode(rows, value_type):
+    """
+    Columns of `history.get` `rows` as NumPy arrays.
+    """
+    cols = dict(
+        itemid = _ints(rows, 'itemid'),
+        clock = _ints(rows, 'clock'),
+        ns = None,
+        value = _typed(rows, 'value', value_type),
+    )
+    if rows and 'ns' in rows[0]:
+        cols['ns'] = _ints(rows, 'ns')
+    return cols
+
+
+def _decode_trends(rows, value_type):
+    """
+    Columns of `trend.get` `rows` as NumPy arrays.
+    """
+    return dict(
+        itemid = _ints(rows, 'itemid'),
+        clock = _ints(rows, 'clock'),
+        value = numpy.fromiter(map(float, map(itemgetter('value_avg'), rows)), numpy.float64, len(rows)),
+        value_min = _typed(rows, 'value_min', value_type),
+        value_max = _typed(rows, 'value_max', value_type),
+        num = _ints(rows, 'num'),
+    )
+
+
+def _decode_pages(pages, value_type, decode=_decode):
+    """
+    Columns of all `pages` concatenated and ordered by item then time.
+    """
+    decoded = [decode(i, value_type) for i in pages]
+    if not decoded:
+        decoded = [decode([], value_type)]
+    cols = dict()
+    for name in decoded[0]:
+        parts = [i[name] for i in decoded]
+        if any(i is None for i in parts):
+            cols[name] = None
+        else:
+            cols[name] = numpy.concatenate(parts)
+    keys = [cols['clock'], cols['itemid']]
+    if cols.get('ns') is not None:
+        keys.insert(0, cols['ns'])
+    order = numpy.lexsort(keys)
+    for name, col in cols.items():
+        if col is not None:
+            cols[name] = col[order]
+    return cols
@@ -0,0 +1,290 @@
+"""
+Following events & problems as they change.
+"""
+
+import asyncio
+import time
+from . import objects
+from .objects.api import _epoch
+
+__all__ = [
+    'EventStream',
+    'ProblemTracker',
+    'ProblemChanges',
+]
+
+
+class EventStream(object):
+    """
+    New events matching `params` as they happen, either as a generator:
+
+        for event in EventStream(api, source=0):
+            ...
+
+    or an async iterator with an `AsyncApi` (or `Api`, polled in a thread):
+
+        async for event in EventStream(api, source=0):
+            ...
+
+    Events come in id order starting after `after`, or after the newest
+    event at the first poll.  Each poll asks only for events past the last
+    id seen via `eventid_from`, with just `FIELDS`, and loads the triggers
+    of all its events with one `trigger.get` (along with their hosts).
+
+    Polling adapts to load: back-to-back while pages come back full, every
+    `min_interval` seconds while events keep arriving, backing off towards
+    `max_interval` while quiet, and never more often than the last poll
+    took so a slow frontend isn't swamped.
+    """
+
+    FIELDS = ('source', 'object', 'objectid', 'clock', 'ns', 'value')
+
+    TRIGGER_FIELDS = ('description', 'priority', 'value', 'status', 'lastchange')
+
+    HOST_FIELDS = ('hostid', 'host', 'name')
+
+    def __init__(self, api, after=None, page_size=1000, min_interval=1, max_interval=30, triggers=True, **params):
+        self.api = api
+        self.last_id = after
+        self.page_size = page_size
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min_interval
+        self.triggers = triggers
+        self.params = params
+
+
+    def __iter__(self):
+        while True:
+            for event in self.poll():
+                yield event
+            time.sleep(self.interval)
+
+
+    async def __aiter__(self):
+        while True:
+            for event in await self.apoll():
+                yield event
+            await asyncio.sleep(self.interval)
+
+
+    def poll(self):
+        """
+        `[Event]` since the last poll, oldest first.
+        """
+        started = time.time()
+        if self.last_id is None:
+            self.last_id = self._latest_id(self.api.response('event.get', **self._latest_params()))
+        events = objects.Event.get(self.api, **self._params())
+        ids = self._trigger_ids(events)
+        if ids:
+            self._set_triggers(events, objects.Trigger.get(self.api, **self._triggers_params(ids)))
+        self._advance(events, time.time() - started)
+        return events
+
+
+    async def apoll(self):
+        """
+        Awaitable `poll`.
+        """
+        # Import here to avoid circular imports.
+        from .aio import AsyncApi
+        if not isinstance(self.api, AsyncApi):
+            return await asyncio.get_running_loop().run_in_executor(None, self.poll)
+        started = time.time()
+        if self.last_id is None:
+            self.last_id = self._latest_id(await self.api.response('event.get', **self._latest_params()))
+        events = await objects.Event.aget(self.api, **self._params())
+        ids = self._trigger_ids(events)
+        if ids:
+            self._set_triggers(events, await objects.Trigger.aget(self.api, **self._triggers_params(ids)))
+        self._advance(events, time.time() - started)
+        return events
+
+
+    def _latest_params(self):
+        return dict(self.params, output=['eventid'], sortfield='eventid', sortorder='DESC', limit=1)
+
+
+    @staticmethod
+    def _latest_id(reply):
+        result = reply.get('result')
+        return int(result[0]['eventid']) if result else 0
+
+
+    def _params(self):
+        return dict(
+            self.params,
+            fields = self.FIELDS,
+            selects = (),
+            sortfield = 'eventid',
+            sortorder = 'ASC',
+            limit = self.page_size,
+            eventid_from = self.last_id + 1,
+        )
+
+
+    def _trigger_ids(self, events):
+        if not self.triggers:
+            return []
+        return sorted(set(i.objectid.val for i in events if i.object.val == 0))
+
+
+    def _triggers_params(self, ids):
+        return dict(
+            triggerids = ids,
+            fields = self.TRIGGER_FIELDS,
+            selects = dict(Hosts=list(self.HOST_FIELDS)),
+            expandDescription = True,
+        )
+
+
+    @staticmethod
+    def _set_triggers(events, triggers):
+        by_id = dict((str(i.id), i) for i in triggers)
+        for event in events:
+            if event.object.val == 0:
+                event._trigger = by_id.get(str(event.objectid.val))
+
+
+    def _advance(self, events, took):
+        """
+        Move the cursor past `events` and pick the wait before the next poll.
+        """
+        if events:
+            self.last_id = max(self.last_id, int(events[-1].id))
+        if len(events) >= self.page_size:
+            self.interval = 0
+        elif events:
+            self.interval = max(self.min_interval, took)
+        else:
+            self.interval = max(min(self.interval * 2 or self.min_interval, self.max_interval), took)
+
+
+class ProblemTracker(object):
+    """
+    What changed in the problems matching `params` between polls, rather
+    than the full set each time:
+
+        tracker = ProblemTracker(api, groupids=4)
+        while True:
+            changes = tracker.poll()
+            if changes:
+                post(changes.json())
+            time.sleep(15)
+
+    The previous poll's problems are kept by `eventid`, with only `fields`
+    fetched.  The default `FIELDS` are those of the Zabbix 3.4 problem
+    object; on 4.0 & later, add the likes of `severity` & `acknowledged`
+    to see their changes, eg `fields=ProblemTracker.FIELDS + ('severity',
+    'acknowledged')`.  The first poll reports every problem as added.  With
+    `recent`, resolved problems stay in `problem.get` replies for a while
+    and are reported once, with their `r_eventid` & `r_clock`; otherwise a
+    problem is resolved when it drops out.  `time_from` (a datetime or
+    epoch seconds) limits tracking to problems created since.
+    """
+
+    FIELDS = ('eventid', 'objectid', 'clock', 'r_eventid', 'r_clock', 'correlationid', 'userid')
+
+    def __init__(self, api, recent=False, time_from=None, fields=None, **params):
+        self.api = api
+        self.recent = recent
+        self.time_from = time_from
+        self.fields = tuple(fields or self.FIELDS)
+        self.params = params
+        self.problems = dict()
+
+
+    def poll(self):
+        """
+        `ProblemChanges` since the last poll.
+        """
+        return self._diff(self.api.response('problem.get', **self._params()).get('result'))
+
+
+    async def apoll(self):
+        """
+        Awaitable `poll`.
+        """
+        # Import here to avoid circular imports.
+        from .aio import AsyncApi
+        if not isinstance(self.api, AsyncApi):
+            return await asyncio.get_running_loop().run_in_executor(None, self.poll)
+        reply = await self.api.response('problem.get', **self._params())
+        return self._diff(reply.get('result'))
+
+
+    def _params(self):
+        fields = list(self.fields)
+        for name in ('eventid', 'r_eventid'):
+            if name not in fields:
+                fields.append(name)
+        params = dict(self.params, output=fields, sortfield='eventid', sortorder='ASC')
+        if self.recent:
+            params['recent'] = True
+        if self.time_from is not None:
+            params['time_from'] = _epoch(self.time_from)
+        return params
+
+
+    def _diff(self, rows):
+        """
+        `ProblemChanges` from the last poll's problems to `rows`, which then
+        become the last poll's.
+        """
+        changes = ProblemChanges()
+        current = dict()
+        for row in rows:
+            id = row['eventid']
+            old = self.problems.get(id)
+            resolved = str(row.get('r_eventid') or '0') != '0'
+            if old is None:
+                if resolved:
+                    # Came and went between polls.
+                    changes.resolved.append(row)
+                else:
+                    changes.added.append(row)
+            elif resolved and str(old.get('r_eventid') or '0') == '0':
+                changes.resolved.append(row)
+            else:
+                diff = dict((k, v) for k, v in row.items() if old.get(k) != v)
+                if diff:
+                    diff['eventid'] = id
+                    changes.changed.append(diff)
+            current[id] = row
+        for id, old in self.problems.items():
+            if id not in current and str(old.get('r_eventid') or '0') == '0':
+                changes.resolved.append(old)
+        changes.resolved.sort(key=lambda i: int(i['eventid']))
+        self.problems = current
+        return changes
+
+
+class ProblemChanges(object):
+    """
+    Problems `added`, `resolved` & `changed` between `ProblemTracker` polls.
+    Added & resolved are the problems' fields; changed only has `eventid`
+    and the fields whose values changed.
+    """
+
+    def __init__(self):
+        self.added = []
+        self.resolved = []
+        self.changed = []
+
+
+    def __bool__(self):
+        return bool(self.added or self.resolved or self.changed)
+
+
+    def __repr__(self):
+        return '<ProblemChanges +{} -{} ~{}>'.format(len(self.added), len(self.resolved), len(self.changed))
+
+
+    def json(self):
+        """
+        Compact json-able form: added & changed as above, resolved as just
+        the `eventid`, `r_eventid` & `r_clock` of each.
+        """
+        resolved = [dict((k, i[k]) for k in ('eventid', 'r_eventid', 'r_clock') if k in i) for i in self.resolved]
+        return dict(added=self.added, resolved=resolved, changed=self.changed)